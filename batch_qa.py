@@ -0,0 +1,200 @@
+"""
+Batch Question Answering
+Jawab ribuan pertanyaan dari file JSONL/CSV secara konkuren dan tulis
+hasilnya (beserta timing per tahap) ke file JSONL yang bisa di-resume
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Set
+
+
+def read_questions(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Baca pertanyaan dari file JSONL atau CSV
+
+    JSONL: satu object per baris dengan field 'question' (dan opsional 'id'),
+    atau satu string JSON per baris. CSV: kolom 'question' (dan opsional 'id').
+    Jika 'id' tidak ada, nomor baris dipakai sebagai id.
+
+    Args:
+        path: Path file input
+
+    Yields:
+        Dict dengan key 'id' dan 'question'
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for line_no, row in enumerate(csv.DictReader(f), 1):
+                question = (row.get("question") or "").strip()
+                if question:
+                    yield {"id": str(row.get("id") or line_no), "question": question}
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Baris {line_no} bukan JSON yang valid, dilewati")
+                continue
+
+            if isinstance(record, str):
+                record = {"question": record}
+            if not isinstance(record, dict):
+                print(f"Baris {line_no} bukan object atau string JSON, dilewati")
+                continue
+            question = str(record.get("question", "")).strip()
+            if question:
+                yield {"id": str(record.get("id", line_no)), "question": question}
+
+
+def compact_output(output_path: str) -> Set[str]:
+    """
+    Siapkan file output untuk resume: tulis ulang hanya jawaban yang berhasil
+    (satu per id), sehingga record error yang akan dicoba lagi dan baris
+    terpotong dari proses yang terhenti tidak tertinggal di output
+
+    Returns:
+        Id pertanyaan yang sudah dijawab
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+
+    tmp_path = output_path + ".tmp"
+    with open(output_path, encoding="utf-8") as f, open(tmp_path, "w", encoding="utf-8") as out:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Baris terakhir bisa terpotong jika proses sebelumnya terhenti
+                continue
+            if not isinstance(record, dict) or "error" in record:
+                continue
+            record_id = str(record.get("id"))
+            if record_id not in done:
+                done.add(record_id)
+                out.write(line.rstrip("\n") + "\n")
+    os.replace(tmp_path, output_path)
+    return done
+
+
+def run_batch(chatbot, input_path: str, output_path: str, workers: int = 4,
+              batch_size: int = 32, resume: bool = True) -> Dict[str, float]:
+    """
+    Jawab semua pertanyaan di input_path dan tulis hasilnya ke output_path
+
+    Pertanyaan diproses per batch: embedding seluruh batch dihitung dengan
+    satu panggilan model, lalu retrieval dan generate dijalankan paralel
+    oleh `workers` thread. Setiap jawaban langsung ditulis (dan di-flush)
+    sehingga proses yang terhenti bisa dilanjutkan dengan resume=True.
+
+    Args:
+        chatbot: ChatbotRAG yang sudah di-setup
+        input_path: File pertanyaan (.jsonl atau .csv)
+        output_path: File output JSONL
+        workers: Jumlah thread paralel
+        batch_size: Jumlah pertanyaan per batch embedding
+        resume: Lewati pertanyaan yang sudah ada di output
+
+    Returns:
+        Dict statistik (answered, errors, skipped, elapsed_s, questions_per_s)
+    """
+    done = compact_output(output_path) if resume else set()
+    questions = [q for q in read_questions(input_path) if q["id"] not in done]
+    print(f"=== Batch QA: {len(questions)} pertanyaan, {len(done)} sudah dijawab, {workers} worker ===")
+
+    mode = "a" if resume else "w"
+
+    write_lock = threading.Lock()
+    stats = {"answered": 0, "errors": 0}
+    stage_totals = {"embed_ms": 0.0, "retrieve_ms": 0.0, "generate_ms": 0.0}
+
+    def error_record(item: Dict[str, str], error: Exception, timings: Dict[str, float]) -> Dict:
+        return {
+            "id": item["id"],
+            "question": item["question"],
+            "error": str(error),
+            "timings": {name: round(value, 2) for name, value in timings.items()},
+        }
+
+    def answer_one(item: Dict[str, str], embedding: List[float], embed_ms: float) -> Dict:
+        start = time.perf_counter()
+        try:
+            answer, timings = chatbot.answer_with_timings(item["question"], query_embedding=embedding)
+            record = {"id": item["id"], "question": item["question"], "answer": answer}
+        except Exception as e:
+            return error_record(item, e, {"embed_ms": embed_ms,
+                                          "total_ms": embed_ms + (time.perf_counter() - start) * 1000})
+
+        timings["embed_ms"] = embed_ms
+        timings["total_ms"] = embed_ms + (time.perf_counter() - start) * 1000
+        record["timings"] = {name: round(value, 2) for name, value in timings.items()}
+        return record
+
+    start_time = time.perf_counter()
+    with open(output_path, mode, encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        for offset in range(0, len(questions), batch_size):
+            batch = questions[offset:offset + batch_size]
+
+            embed_start = time.perf_counter()
+            try:
+                embeddings = chatbot.rag_system.embed_queries([item["question"] for item in batch])
+                embed_error = None
+            except Exception as e:
+                print(f"Error saat embedding batch: {e}")
+                embed_error = e
+            # Biaya embedding batch dibagi rata ke setiap pertanyaan
+            embed_ms = (time.perf_counter() - embed_start) * 1000 / len(batch)
+
+            if embed_error is not None:
+                records = [error_record(item, embed_error, {"embed_ms": embed_ms}) for item in batch]
+            else:
+                futures = [
+                    executor.submit(answer_one, item, embedding, embed_ms)
+                    for item, embedding in zip(batch, embeddings)
+                ]
+                records = (future.result() for future in as_completed(futures))
+
+            for record in records:
+                with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+
+                if "error" in record:
+                    stats["errors"] += 1
+                else:
+                    stats["answered"] += 1
+                    for name in stage_totals:
+                        stage_totals[name] += record["timings"].get(name, 0.0)
+
+            print(f"Progress: {min(offset + batch_size, len(questions))}/{len(questions)}")
+
+    elapsed = time.perf_counter() - start_time
+    answered = stats["answered"]
+    result = {
+        "answered": answered,
+        "errors": stats["errors"],
+        "skipped": len(done),
+        "elapsed_s": elapsed,
+        "questions_per_s": answered / elapsed if elapsed > 0 else 0.0,
+    }
+
+    print("\n=== Ringkasan Batch QA ===")
+    print(f"Dijawab     : {answered} (error {stats['errors']}, dilewati {len(done)})")
+    print(f"Waktu total : {elapsed:.2f} detik")
+    print(f"Throughput  : {result['questions_per_s']:.2f} pertanyaan/detik")
+    if answered:
+        for name, total in stage_totals.items():
+            print(f"Rata-rata {name:<12}: {total / answered:.2f}")
+    print(f"Output      : {output_path}")
+
+    return result
@@ -0,0 +1,91 @@
+"""
+Benchmark Deduplikasi
+Bandingkan ukuran index, latency search, dan keragaman hasil top-k
+antara index tanpa dan dengan deduplikasi near-duplicate
+"""
+
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Dict
+
+from rag_system import RAGSystem
+
+
+QUERIES = [
+    "Siapa itu Reina Mishima?",
+    "Apa itu Purple Lightning?",
+    "Ceritakan tentang Devil Gene dalam keluarga Mishima",
+    "Bagaimana sejarah keluarga Mishima?",
+    "Apa itu Python?",
+    "Library apa saja untuk data science?",
+]
+
+
+def benchmark(deduplicate: bool, repeats: int = 20, k: int = 3) -> Dict[str, float]:
+    """
+    Bangun index sementara lalu ukur latency search
+
+    Args:
+        deduplicate: Aktifkan deduplikasi saat ingest
+        repeats: Jumlah pengulangan untuk setiap query
+        k: Jumlah dokumen per search
+
+    Returns:
+        Dict berisi jumlah chunk, waktu deduplikasi, latency rata-rata/p95 (ms),
+        dan rasio hasil unik
+    """
+    persist_directory = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        rag = RAGSystem(persist_directory=persist_directory, deduplicate=deduplicate)
+        split_docs = rag.split_documents(rag.load_documents())
+        start = time.perf_counter()
+        chunks = rag.deduplicate_documents(split_docs)
+        dedup_ms = (time.perf_counter() - start) * 1000
+        rag.create_vectorstore(chunks)
+
+        latencies = []
+        unique_ratio = []
+        for query in QUERIES:
+            # Query vector dihitung sekali agar yang diukur hanya pencarian index
+            embedding = rag.embeddings.embed_query(query)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                docs = rag.vectorstore.similarity_search_by_vector(embedding, k=k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            unique_ratio.append(len({doc.page_content for doc in docs}) / max(1, len(docs)))
+
+        latencies.sort()
+        return {
+            "chunks": len(chunks),
+            "dedup_ms": dedup_ms,
+            "mean_ms": statistics.mean(latencies),
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+            "unique_top_k": statistics.mean(unique_ratio),
+        }
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
+
+
+def main():
+    """
+    Cetak laporan perbandingan
+    """
+    before = benchmark(deduplicate=False)
+    after = benchmark(deduplicate=True)
+
+    print("\n=== Laporan Deduplikasi ===")
+    print(f"{'':<16} {'tanpa dedup':>12} {'dengan dedup':>12}")
+    print(f"{'chunks':<16} {before['chunks']:>12} {after['chunks']:>12}")
+    print(f"{'dedup ms':<16} {before['dedup_ms']:>12.2f} {after['dedup_ms']:>12.2f}")
+    print(f"{'mean search ms':<16} {before['mean_ms']:>12.2f} {after['mean_ms']:>12.2f}")
+    print(f"{'p95 search ms':<16} {before['p95_ms']:>12.2f} {after['p95_ms']:>12.2f}")
+    print(f"{'unique top-k':<16} {before['unique_top_k']:>12.2f} {after['unique_top_k']:>12.2f}")
+
+    shrink = 1 - after["chunks"] / before["chunks"] if before["chunks"] else 0.0
+    print(f"\nIndex {shrink:.1%} lebih kecil")
+
+
+if __name__ == "__main__":
+    main()
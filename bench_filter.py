@@ -0,0 +1,104 @@
+"""
+Benchmark Filtered Search
+Bandingkan latency dan precision search dengan dan tanpa filter domain
+seiring bertambahnya ukuran korpus
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from langchain.schema import Document
+from rag_system import RAGSystem
+
+
+# Query beserta domain yang diharapkan
+LABELED_QUERIES = [
+    ("Siapa itu Reina Mishima?", "tekken"),
+    ("Apa itu Purple Lightning?", "tekken"),
+    ("Ceritakan tentang Devil Gene dalam keluarga Mishima", "tekken"),
+    ("Reina Esther perasaan menyukai", "tekken"),
+    ("Apa itu Python?", "teknologi"),
+    ("Framework apa saja untuk web development Python?", "teknologi"),
+    ("Library apa saja untuk data science?", "teknologi"),
+    ("Apa perbedaan supervised dan unsupervised learning?", "teknologi"),
+]
+
+
+def grow_corpus(chunks: List[Document], scale: int) -> List[Document]:
+    """
+    Perbesar korpus dengan menyalin chunk sebanyak `scale` kali
+    """
+    grown = []
+    for copy in range(scale):
+        for doc in chunks:
+            metadata = dict(doc.metadata, copy=copy)
+            grown.append(Document(page_content=doc.page_content, metadata=metadata))
+    return grown
+
+
+def measure(rag: RAGSystem, k: int, use_filter: bool, repeats: int) -> Dict[str, float]:
+    """
+    Ukur latency dan precision@k untuk semua query berlabel
+    """
+    latencies = []
+    precisions = []
+    for query, expected_domain in LABELED_QUERIES:
+        embedding = rag.embeddings.embed_query(query)
+        search_filter: Optional[dict] = {"domain": expected_domain} if use_filter else None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            docs = rag.vectorstore.similarity_search_by_vector(embedding, k=k, filter=search_filter)
+            latencies.append((time.perf_counter() - start) * 1000)
+        hits = sum(1 for doc in docs if doc.metadata.get("domain") == expected_domain)
+        precisions.append(hits / max(1, len(docs)))
+
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "precision": statistics.mean(precisions),
+    }
+
+
+def main():
+    """
+    Jalankan benchmark untuk beberapa skala korpus
+    """
+    parser = argparse.ArgumentParser(description="Benchmark filtered vs unfiltered search")
+    parser.add_argument("--scales", default="1,10,50", help="Faktor pengali korpus, dipisah koma")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    base = RAGSystem(deduplicate=False)
+    chunks = base.split_documents(base.load_documents())
+
+    rows = []
+    for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+        # Setiap skala dibangun di folder sementara dengan embeddings (dan cache) yang sama
+        persist_directory = tempfile.mkdtemp(prefix="bench_filter_")
+        try:
+            rag = RAGSystem(persist_directory=persist_directory, embedding_cache_directory=None,
+                            embeddings=base.embeddings)
+            corpus = grow_corpus(chunks, scale)
+            rag.create_vectorstore(corpus)
+            rows.append((len(corpus),
+                         measure(rag, args.k, use_filter=False, repeats=args.repeats),
+                         measure(rag, args.k, use_filter=True, repeats=args.repeats)))
+        finally:
+            shutil.rmtree(persist_directory, ignore_errors=True)
+
+    print("\n=== Filtered vs Unfiltered Search ===")
+    print(f"{'chunks':>8} {'mean ms':>9} {'p95 ms':>9} {'prec':>6} | {'mean ms':>9} {'p95 ms':>9} {'prec':>6}")
+    print(f"{'':>8} {'--- tanpa filter ---':>26} | {'--- filter domain ---':>26}")
+    for size, plain, filtered in rows:
+        print(f"{size:>8} {plain['mean_ms']:>9.2f} {plain['p95_ms']:>9.2f} {plain['precision']:>6.2f} | "
+              f"{filtered['mean_ms']:>9.2f} {filtered['p95_ms']:>9.2f} {filtered['precision']:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+HTTP Server untuk Chatbot RAG
+Layanan HTTP/JSON dengan model pre-fork: beberapa worker proses berbagi
+satu vector store di disk secara read-only
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional
+from urllib import error as urlerror
+from urllib import parse as urlparse
+from urllib import request as urlrequest
+
+# Batas jumlah dokumen per request /search
+MAX_SEARCH_K = 20
+# Batas ukuran body request dan timeout socket per koneksi. Setiap worker
+# melayani satu koneksi sekaligus, jadi klien yang diam tidak boleh menahannya
+MAX_BODY_BYTES = 1024 * 1024
+REQUEST_TIMEOUT = 30.0
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler HTTP/JSON untuk endpoint chat, search, history, health, dan ready
+    """
+
+    timeout = REQUEST_TIMEOUT
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Optional[Dict]:
+        """
+        Baca body JSON object. Jika body tidak valid, response error sudah
+        dikirim dan hasilnya None
+        """
+        # Body yang tidak dibaca tidak boleh terbaca sebagai request berikutnya
+        self.close_connection = True
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Header Content-Length wajib berisi angka >= 0"})
+            return None
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Body maksimal {MAX_BODY_BYTES} byte"})
+            return None
+
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except socket.timeout:
+            self._send_json(408, {"error": "Timeout saat membaca body request"})
+            return None
+        except (ValueError, UnicodeDecodeError):
+            data = None
+        if not isinstance(data, dict):
+            self._send_json(400, {"error": "Body harus berupa JSON object"})
+            return None
+
+        self.close_connection = False
+        return data
+
+    def _send_history(self, query: str):
+        params = urlparse.parse_qs(query)
+        conversation_id = params.get("conversation_id", [""])[0].strip()
+        if not conversation_id:
+            self._send_json(400, {"error": "Parameter 'conversation_id' wajib diisi"})
+            return
+        try:
+            limit = int(params["limit"][0]) if "limit" in params else None
+        except ValueError:
+            self._send_json(400, {"error": "Parameter 'limit' harus berupa bilangan bulat"})
+            return
+        if limit is not None and limit < 1:
+            self._send_json(400, {"error": "Parameter 'limit' harus lebih dari 0"})
+            return
+
+        store = self.server.chatbot.conversation_store
+        if store is None:
+            self._send_json(404, {"error": "Conversation store tidak aktif di server"})
+            return
+        try:
+            history = store.get_history(conversation_id, limit=limit)
+        except Exception as e:
+            self._send_json(500, {"error": f"Terjadi error: {e}"})
+            return
+        self._send_json(200, {"conversation_id": conversation_id, "history": history,
+                              "worker": self.server.worker_id})
+
+    def do_GET(self):
+        url = urlparse.urlsplit(self.path)
+        if url.path == "/history":
+            self._send_history(url.query)
+        elif url.path == "/health":
+            self._send_json(200, {"status": "ok", "worker": self.server.worker_id, "pid": os.getpid()})
+        elif url.path == "/ready":
+            # Worker baru mulai accept() setelah setup dan warm-up selesai,
+            # jadi worker yang menjawab request ini pasti sudah siap
+            self._send_json(200, {"ready": True, "worker": self.server.worker_id})
+        else:
+            self._send_json(404, {"error": "Endpoint tidak ditemukan"})
+
+    def do_POST(self):
+        data = self._read_json()
+        if data is None:
+            return
+        path = urlparse.urlsplit(self.path).path
+
+        start = time.perf_counter()
+        try:
+            if path == "/chat":
+                question = str(data.get("question", "")).strip()
+                if not question:
+                    self._send_json(400, {"error": "Field 'question' wajib diisi"})
+                    return
+                conversation_id = data.get("conversation_id")
+                if conversation_id is not None and (not isinstance(conversation_id, str) or not conversation_id.strip()):
+                    self._send_json(400, {"error": "Field 'conversation_id' harus berupa string yang tidak kosong"})
+                    return
+                payload = {"answer": self.server.chatbot.chat(question, conversation_id=conversation_id)}
+
+            elif path == "/search":
+                query = str(data.get("query", "")).strip()
+                if not query:
+                    self._send_json(400, {"error": "Field 'query' wajib diisi"})
+                    return
+                try:
+                    k = int(data.get("k", 3))
+                except (TypeError, ValueError):
+                    self._send_json(400, {"error": "Field 'k' harus berupa bilangan bulat"})
+                    return
+                if not 1 <= k <= MAX_SEARCH_K:
+                    self._send_json(400, {"error": f"Field 'k' harus antara 1 dan {MAX_SEARCH_K}"})
+                    return
+                docs = self.server.chatbot.rag_system.search_documents(query, k=k)
+                payload = {
+                    "results": [
+                        {"content": doc.page_content, "metadata": doc.metadata}
+                        for doc in docs
+                    ]
+                }
+
+            else:
+                self._send_json(404, {"error": "Endpoint tidak ditemukan"})
+                return
+
+        except Exception as e:
+            self._send_json(500, {"error": f"Terjadi error: {e}"})
+            return
+
+        payload["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        payload["worker"] = self.server.worker_id
+        self._send_json(200, payload)
+
+    def log_message(self, format, *args):
+        # Access log per request terlalu ramai untuk load test
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ChatHTTPServer(HTTPServer):
+    """
+    HTTPServer yang memakai socket listening milik master (pre-fork)
+    """
+
+    def __init__(self, listen_socket: socket.socket, chatbot, worker_id: int, verbose: bool = False):
+        super().__init__(listen_socket.getsockname()[:2], ChatRequestHandler, bind_and_activate=False)
+        # Ganti socket bawaan dengan socket yang sudah di-bind oleh master
+        self.socket.close()
+        self.socket = listen_socket
+        self.chatbot = chatbot
+        self.worker_id = worker_id
+        self.verbose = verbose
+
+
+def _build_chatbot(use_openai: bool):
+    """
+    Buat ChatbotRAG di dalam worker (import dilakukan setelah fork agar
+    model dan client Chroma tidak dibagi antar proses)
+    """
+    from chatbot_rag import ChatbotRAG
+    from conversation_store import get_default_store
+
+    return ChatbotRAG(openai_api_key=os.getenv("OPENAI_API_KEY"), use_openai=use_openai,
+                      conversation_store=get_default_store())
+
+
+def _run_worker(listen_socket: socket.socket, worker_id: int, use_openai: bool, verbose: bool):
+    """
+    Loop utama worker: setup read-only, warm-up, lalu layani request
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    chatbot = _build_chatbot(use_openai)
+    server: Optional[ChatHTTPServer] = None
+
+    def shutdown(signum, frame):
+        # Handler sinyal tidak boleh menyentuh lock atau antrian (bisa deadlock
+        # jika sinyal datang saat lock yang sama sedang dipegang). Sebelum server
+        # berjalan belum ada pesan yang diterima, jadi boleh langsung keluar;
+        # setelahnya cukup minta serve_forever berhenti dari thread lain
+        if server is None:
+            os._exit(0)
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    if not chatbot.setup(read_only=True):
+        print(f"[worker {worker_id}] Gagal setup chatbot")
+        os._exit(1)
+
+    # Warm-up: muat bobot model embedding dan index HNSW ke memori
+    # sebelum worker mulai menerima koneksi
+    chatbot.rag_system.search_documents("warm-up", k=1)
+
+    server = ChatHTTPServer(listen_socket, chatbot, worker_id, verbose=verbose)
+    print(f"[worker {worker_id}] Siap melayani (pid {os.getpid()})")
+
+    exit_code = 0
+    try:
+        server.serve_forever()
+    except Exception as e:
+        print(f"[worker {worker_id}] Error: {e}")
+        exit_code = 1
+    finally:
+        # Tulis riwayat percakapan yang masih di buffer sebelum keluar
+        if chatbot.conversation_store:
+            chatbot.conversation_store.close()
+        os._exit(exit_code)
+
+
+def _ensure_index() -> bool:
+    """
+    Pastikan vector store sudah ada sebelum worker di-fork.
+    Index dibangun sekali di proses anak supaya master tetap ringan
+    (tanpa model dan thread torch) saat melakukan fork.
+    """
+    pid = os.fork()
+    if pid == 0:
+        from rag_system import RAGSystem
+
+        os._exit(0 if RAGSystem().setup_rag() else 1)
+
+    _, status = os.waitpid(pid, 0)
+    return os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 2,
+          use_openai: bool = False, verbose: bool = False) -> int:
+    """
+    Jalankan server pre-fork
+
+    Args:
+        host: Alamat bind
+        port: Port bind
+        workers: Jumlah worker proses
+        use_openai: Apakah worker menggunakan OpenAI
+        verbose: Tampilkan access log per request
+
+    Returns:
+        Exit code
+    """
+    if not hasattr(os, "fork"):
+        print("Mode multi-proses membutuhkan os.fork (Linux/macOS)")
+        return 1
+
+    print("=== Menyiapkan vector store ===")
+    if not _ensure_index():
+        print("Gagal menyiapkan vector store")
+        return 1
+
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(128)
+    # Non-blocking agar worker yang kalah berebut accept() tidak ikut terblokir
+    listen_socket.setblocking(False)
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(listen_socket, worker_id, use_openai, verbose)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"=== Server berjalan di http://{host}:{port} dengan {workers} worker ===")
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        worker_id = children.pop(pid, None)
+        if worker_id is None or stopping:
+            continue
+
+        print(f"[master] Worker {worker_id} berhenti (status {status}), menjalankan ulang...")
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) != 0:
+            # Hindari restart loop yang terlalu cepat jika setup selalu gagal
+            time.sleep(1)
+        spawn(worker_id)
+
+    listen_socket.close()
+    print("Server dihentikan")
+    return 0
+
+
+class ChatbotClient:
+    """
+    Klien HTTP tipis untuk chat_server dengan antarmuka setup()/chat()
+    yang sama seperti ChatbotRAG
+    """
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8000", timeout: float = 60.0):
+        """
+        Inisialisasi klien
+
+        Args:
+            base_url: URL dasar chat_server
+            timeout: Timeout request dalam detik
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path: str, payload: Optional[Dict] = None) -> Dict:
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        req = urlrequest.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urlerror.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise RuntimeError(message) from e
+
+    def is_ready(self) -> bool:
+        """
+        Cek apakah server siap menerima request
+        """
+        try:
+            return bool(self._request("/ready").get("ready"))
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+    def setup(self) -> bool:
+        """
+        Setup klien (memastikan server siap)
+
+        Returns:
+            True jika server siap, False jika tidak
+        """
+        if self.is_ready():
+            print(f"Terhubung ke chat server {self.base_url}")
+            return True
+
+        print(f"Chat server {self.base_url} belum siap")
+        return False
+
+    def chat(self, question: str, conversation_id: Optional[str] = None) -> str:
+        """
+        Kirim pertanyaan ke server
+
+        Args:
+            question: Pertanyaan user
+            conversation_id: Id percakapan untuk disimpan server (opsional)
+
+        Returns:
+            Response dari chatbot
+        """
+        payload = {"question": question}
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+        return self._request("/chat", payload)["answer"]
+
+    def get_history(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Ambil riwayat percakapan dari conversation store milik server
+
+        Args:
+            conversation_id: Id percakapan
+            limit: Hanya ambil N pesan terakhir (opsional)
+
+        Returns:
+            List of dict berisi role, message, dan created_at
+        """
+        params = {"conversation_id": conversation_id}
+        if limit:
+            params["limit"] = limit
+        return self._request("/history?" + urlparse.urlencode(params))["history"]
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """
+        Cari dokumen relevan melalui server
+
+        Args:
+            query: Query pencarian
+            k: Jumlah dokumen
+
+        Returns:
+            List of dict berisi content dan metadata
+        """
+        return self._request("/search", {"query": query, "k": k})["results"]
+
+
+def main():
+    """
+    Entry point CLI untuk chat server
+    """
+    parser = argparse.ArgumentParser(description="HTTP/JSON server untuk Chatbot RAG")
+    parser.add_argument("--host", default=os.getenv("CHATBOT_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("CHATBOT_SERVER_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CHATBOT_SERVER_WORKERS", "2")))
+    parser.add_argument("--use-openai", action="store_true", help="Gunakan OpenAI (butuh OPENAI_API_KEY)")
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan access log")
+    args = parser.parse_args()
+
+    sys.exit(serve(args.host, args.port, max(1, args.workers), args.use_openai, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
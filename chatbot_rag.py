@@ -3,32 +3,73 @@ Chatbot dengan LangChain dan RAG
 Implementasi chatbot yang menggunakan Retrieval-Augmented Generation
 """
 
+import argparse
 import os
-from typing import List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
 from rag_system import RAGSystem
+from conversation_store import ConversationStore, get_default_store
+from profiling import enable_profiling, enable_profiling_from_env, profiled
+
+
+# Kata kunci intent untuk routing pencarian per domain (lihat TOPIC_DOMAINS di rag_system)
+INTENT_DOMAIN_KEYWORDS = {
+    "tekken": ["tekken", "reina", "mishima", "esther", "andika", "purple lightning", "devil gene"],
+    "teknologi": ["python", "artificial intelligence", "machine learning", "web development", "data science"],
+}
+
+TEKKEN_FILTER = {"domain": "tekken"}
 
 
 class ChatbotRAG:
-    def __init__(self, openai_api_key: Optional[str] = None, use_openai: bool = False):
+    """
+    Chatbot RAG.
+    
+    Concurrency: setup() aman dipanggil dari banyak thread dan hanya berjalan
+    sekali. Setelah setup berhasil, atribut rag_system, llm, retriever,
+    prompt_template dan use_openai dibekukan (assignment baru akan raise
+    AttributeError), sehingga satu instance bisa dipakai bersama oleh thread
+    pool: chat() dan answer_with_timings() tidak mengubah state apa pun.
+    """
+    
+    # Atribut yang tidak boleh diubah setelah setup()
+    _FROZEN_ATTRIBUTES = ("rag_system", "llm", "retriever", "prompt_template", "use_openai",
+                          "conversation_store")
+    
+    def __init__(self, openai_api_key: Optional[str] = None, use_openai: bool = False,
+                 llm=None, rag_system: Optional[RAGSystem] = None,
+                 conversation_store: Optional[ConversationStore] = None):
         """
         Inisialisasi Chatbot dengan RAG
         
         Args:
             openai_api_key: API key untuk OpenAI (opsional)
             use_openai: Apakah menggunakan OpenAI atau model lokal
+            llm: Chat model / Runnable kustom (opsional, dipakai jika use_openai=True)
+            rag_system: RAGSystem kustom (opsional)
+            conversation_store: Store untuk menyimpan riwayat percakapan (opsional)
         """
+        self._frozen = False
+        self._setup_lock = threading.Lock()
         self.use_openai = use_openai
         
         # Setup RAG system
-        self.rag_system = RAGSystem()
+        self.rag_system = rag_system or RAGSystem()
+        
+        # Riwayat percakapan disimpan secara write-behind (tidak menambah latency chat)
+        self.conversation_store = conversation_store
         
         # Setup LLM
-        if use_openai and openai_api_key:
+        if llm is not None:
+            self.llm = llm
+            print("Menggunakan LLM kustom")
+        elif use_openai and openai_api_key:
             self.llm = ChatOpenAI(
                 api_key=openai_api_key,
                 model="gpt-3.5-turbo",
@@ -60,17 +101,34 @@ Instruksi:
             ("human", "{question}")
         ])
     
-    def setup(self) -> bool:
+    def setup(self, read_only: bool = False) -> bool:
         """
         Setup chatbot dan RAG system
         
+        Args:
+            read_only: Jika True, hanya gunakan vector store yang sudah ada
+            
         Returns:
             True jika berhasil, False jika gagal
         """
+        with self._setup_lock:
+            if self._frozen:
+                return True
+            if not self._setup(read_only):
+                return False
+            self._frozen = True
+            return True
+    
+    def __setattr__(self, name, value):
+        if name in self._FROZEN_ATTRIBUTES and self.__dict__.get("_frozen"):
+            raise AttributeError(f"'{name}' tidak bisa diubah setelah setup()")
+        super().__setattr__(name, value)
+    
+    def _setup(self, read_only: bool) -> bool:
         print("=== Setup Chatbot RAG ===")
         
         # Setup RAG system
-        if not self.rag_system.setup_rag():
+        if not self.rag_system.setup_rag(read_only=read_only):
             print("Gagal setup RAG system")
             return False
         
@@ -95,6 +153,22 @@ Instruksi:
         """
         return "\n\n".join([doc.page_content for doc in docs])
     
+    def detect_domain(self, question_lower: str) -> Optional[str]:
+        """
+        Deteksi domain pertanyaan untuk membatasi ruang pencarian
+        
+        Args:
+            question_lower: Pertanyaan user (lowercase)
+            
+        Returns:
+            Nama domain ('tekken' atau 'teknologi') atau None jika tidak jelas
+        """
+        for domain, keywords in INTENT_DOMAIN_KEYWORDS.items():
+            if any(keyword in question_lower for keyword in keywords):
+                return domain
+        return None
+    
+    @profiled("generate_response")
     def get_response_simple(self, question: str, context: str = "") -> str:
         """
         Generate response sederhana tanpa LLM (untuk demo)
@@ -109,9 +183,13 @@ Instruksi:
         # Simple pattern matching responses for demo
         question_lower = question.lower()
         
+        # Batasi pencarian ke domain intent (Tekken vs teknologi) jika terdeteksi
+        domain = self.detect_domain(question_lower)
+        domain_filter = {"domain": domain} if domain else None
+        
         # Default retrieval if no specific context needed
         if not context:
-            relevant_docs = self.rag_system.search_documents(question, k=3)
+            relevant_docs = self.rag_system.search_documents(question, k=3, filter=domain_filter)
             if relevant_docs:
                 context = self.format_docs(relevant_docs)
         
@@ -159,7 +237,7 @@ Library utama meliputi NumPy, Pandas, Matplotlib, dan Scikit-learn."""
         
         elif "esther" in question_lower:
             # Use more specific search for Esther
-            relevant_docs = self.rag_system.search_documents("Reina Esther perasaan menyukai", k=3)
+            relevant_docs = self.rag_system.search_documents("Reina Esther perasaan menyukai", k=3, filter=TEKKEN_FILTER)
             if relevant_docs:
                 context = self.format_docs(relevant_docs)
                 # Look for the specific information about Esther
@@ -176,7 +254,7 @@ Esther adalah seseorang yang disukai oleh Reina Mishima. Reina sudah lama menyim
         
         elif "andika" in question_lower:
             # Use more specific search for Andika
-            relevant_docs = self.rag_system.search_documents("Reina Andika crush hubungan", k=3)
+            relevant_docs = self.rag_system.search_documents("Reina Andika crush hubungan", k=3, filter=TEKKEN_FILTER)
             if relevant_docs:
                 context = self.format_docs(relevant_docs)
                 # Look for the specific information about Andika
@@ -193,7 +271,7 @@ Andika adalah seseorang yang memiliki perasaan crush terhadap Reina Mishima yang
         
         elif "siapa yang disukai" in question_lower or "yang disukai reina" in question_lower:
             # Use more specific search for Reina's crush
-            relevant_docs = self.rag_system.search_documents("Reina menyukai esther perasaan", k=3)
+            relevant_docs = self.rag_system.search_documents("Reina menyukai esther perasaan", k=3, filter=TEKKEN_FILTER)
             if relevant_docs:
                 context = self.format_docs(relevant_docs)
                 # Look for the specific information about who Reina likes
@@ -211,7 +289,7 @@ Reina menyukai seseorang bernama Esther yang sudah lama dia taksir."""
         elif "reina" in question_lower:
             if "siapa yang disukai" in question_lower or "yang disukai" in question_lower:
                 # Handle "who does Reina like" within Reina block
-                relevant_docs = self.rag_system.search_documents("Reina menyukai esther perasaan", k=3)
+                relevant_docs = self.rag_system.search_documents("Reina menyukai esther perasaan", k=3, filter=TEKKEN_FILTER)
                 if relevant_docs:
                     context = self.format_docs(relevant_docs)
                     for doc in relevant_docs:
@@ -289,16 +367,22 @@ Konflik keluarga ini telah mempengaruhi dunia selama beberapa generasi."""
 
 Apakah ada aspek spesifik yang ingin Anda ketahui lebih lanjut?"""
     
-    def get_response_openai(self, question: str) -> str:
+    @profiled("generate_response")
+    def get_response_openai(self, question: str, context: str = "") -> str:
         """
         Generate response menggunakan OpenAI
         
         Args:
             question: Pertanyaan user
+            context: Konteks yang sudah diambil (opsional, jika kosong retriever dipakai)
             
         Returns:
             Response string
         """
+        if context:
+            chain = self.prompt_template | self.llm | StrOutputParser()
+            return chain.invoke({"context": context, "question": question})
+        
         # Create RAG chain
         rag_chain = (
             {"context": self.retriever | self.format_docs, "question": RunnablePassthrough()}
@@ -311,16 +395,27 @@ Apakah ada aspek spesifik yang ingin Anda ketahui lebih lanjut?"""
         response = rag_chain.invoke(question)
         return response
     
-    def chat(self, question: str) -> str:
+    def chat(self, question: str, conversation_id: Optional[str] = None) -> str:
         """
         Main chat function
         
         Args:
             question: Pertanyaan user
+            conversation_id: Id percakapan; jika diisi dan conversation_store
+                tersedia, pertanyaan dan jawaban disimpan ke riwayat
             
         Returns:
             Response dari chatbot
         """
+        response = self._chat(question)
+        
+        if self.conversation_store and conversation_id:
+            self.conversation_store.append(conversation_id, "user", question)
+            self.conversation_store.append(conversation_id, "assistant", response)
+        
+        return response
+    
+    def _chat(self, question: str) -> str:
         if not self.retriever:
             return "Chatbot belum disetup. Silakan panggil setup() terlebih dahulu."
         
@@ -341,15 +436,63 @@ Apakah ada aspek spesifik yang ingin Anda ketahui lebih lanjut?"""
         except Exception as e:
             return f"Terjadi error: {e}"
     
-    def interactive_chat(self):
+    def answer_with_timings(self, question: str,
+                            query_embedding: Optional[List[float]] = None) -> Tuple[str, Dict[str, float]]:
+        """
+        Jawab pertanyaan sambil mencatat waktu setiap tahap (untuk batch/evaluasi)
+        
+        Args:
+            question: Pertanyaan user
+            query_embedding: Embedding pertanyaan yang sudah dihitung (batch), opsional
+            
+        Returns:
+            Tuple (response, timings) dengan timings berisi retrieve_ms dan generate_ms
+        """
+        timings = {}
+        
+        start = time.perf_counter()
+        domain = self.detect_domain(question.lower())
+        domain_filter = {"domain": domain} if domain else None
+        if query_embedding is None:
+            relevant_docs = self.rag_system.search_documents(question, k=3, filter=domain_filter)
+        else:
+            relevant_docs = self.rag_system.search_documents_by_vector(query_embedding, k=3, filter=domain_filter)
+        context = self.format_docs(relevant_docs)
+        timings["retrieve_ms"] = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        if self.use_openai and self.llm:
+            if relevant_docs:
+                response = self.get_response_openai(question, context)
+            else:
+                response = "Maaf, saya tidak menemukan informasi yang relevan untuk pertanyaan Anda."
+        else:
+            response = self.get_response_simple(question, context)
+        timings["generate_ms"] = (time.perf_counter() - start) * 1000
+        
+        return response, timings
+    
+    def interactive_chat(self, conversation_id: Optional[str] = None):
         """
         Mode chat interaktif
+        
+        Args:
+            conversation_id: Id percakapan yang ingin dilanjutkan (opsional)
         """
         print("\n" + "="*50)
         print("🤖 Chatbot RAG - Siap membantu Anda!")
         print("Ketik 'quit' atau 'exit' untuk keluar")
         print("="*50 + "\n")
         
+        if self.conversation_store:
+            if conversation_id:
+                for chat in self.conversation_store.get_history(conversation_id):
+                    label = "Anda" if chat["role"] == "user" else "🤖 Bot"
+                    print(f"{label}: {chat['message']}\n")
+            else:
+                conversation_id = self.conversation_store.new_conversation_id()
+            print(f"Id percakapan: {conversation_id} (gunakan --conversation untuk melanjutkan)\n")
+        
         while True:
             try:
                 question = input("Anda: ").strip()
@@ -362,7 +505,7 @@ Apakah ada aspek spesifik yang ingin Anda ketahui lebih lanjut?"""
                     continue
                 
                 print("\n🤖 Bot: ", end="")
-                response = self.chat(question)
+                response = self.chat(question, conversation_id=conversation_id)
                 print(response)
                 print("\n" + "-"*50 + "\n")
                 
@@ -377,14 +520,41 @@ def main():
     """
     Main function untuk test chatbot
     """
+    parser = argparse.ArgumentParser(description="Chatbot RAG")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    parser.add_argument("--conversation", help="Id percakapan yang ingin dilanjutkan")
+    parser.add_argument("--profile", action="store_true",
+                        help="Aktifkan profiling CPU dan memori (atau set CHATBOT_PROFILE=1)")
+    
+    batch_parser = subparsers.add_parser("batch", help="Jawab pertanyaan dari file JSONL/CSV secara konkuren")
+    batch_parser.add_argument("input", help="File pertanyaan (.jsonl atau .csv)")
+    batch_parser.add_argument("-o", "--output", default="answers.jsonl", help="File output JSONL")
+    batch_parser.add_argument("-w", "--workers", type=int, default=4, help="Jumlah worker paralel")
+    batch_parser.add_argument("--batch-size", type=int, default=32, help="Jumlah pertanyaan per batch embedding")
+    batch_parser.add_argument("--no-resume", action="store_true", help="Timpa output dan mulai dari awal")
+    args = parser.parse_args()
+    
+    # Profiling harus aktif sebelum setup agar tahap ingest ikut terekam
+    if args.profile:
+        enable_profiling()
+    else:
+        enable_profiling_from_env()
+    
     # Inisialisasi chatbot (tanpa OpenAI untuk demo)
-    chatbot = ChatbotRAG(use_openai=False)
+    chatbot = ChatbotRAG(use_openai=False, conversation_store=get_default_store())
     
     # Setup chatbot
     if not chatbot.setup():
         print("Gagal setup chatbot")
         return
     
+    if args.command == "batch":
+        from batch_qa import run_batch
+        run_batch(chatbot, args.input, args.output, workers=args.workers,
+                  batch_size=args.batch_size, resume=not args.no_resume)
+        return
+    
     # Test beberapa pertanyaan
     test_questions = [
         "Apa itu Python?",
@@ -401,7 +571,7 @@ def main():
     
     # Mode interaktif
     print("\n=== Mode Interaktif ===")
-    chatbot.interactive_chat()
+    chatbot.interactive_chat(conversation_id=args.conversation)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,263 @@
+"""
+Conversation Store
+Penyimpanan riwayat percakapan di SQLite (WAL) dengan write-behind batching:
+append() hanya memasukkan pesan ke buffer, thread background yang menulis
+ke database per batch
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+# Percobaan ulang saat database dikunci proses lain (worker, Streamlit, CLI)
+WRITE_RETRIES = 3
+WRITE_RETRY_DELAY = 0.2
+_INSERT_SQL = "INSERT INTO messages (conversation_id, role, message, created_at) VALUES (?, ?, ?, ?)"
+
+
+class _FlushRequest:
+    """
+    Penanda di antrian: writer menulis semua pesan sebelumnya lalu set event
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ConversationStore:
+    """
+    Conversation store berbasis SQLite.
+
+    Pesan yang di-append paling lambat `flush_interval` detik kemudian sudah
+    di-commit ke database, sehingga crash aplikasi hanya bisa kehilangan pesan
+    dalam jendela tersebut. Buffer dibatasi `max_buffer` pesan; jika penuh,
+    append() menunggu writer (backpressure) alih-alih menambah memori.
+    """
+
+    def __init__(self, db_path: str = "conversations.db", flush_interval: float = 1.0,
+                 max_batch_size: int = 200, max_buffer: int = 10000):
+        """
+        Inisialisasi conversation store
+
+        Args:
+            db_path: Path file database SQLite
+            flush_interval: Jeda maksimal (detik) sebelum pesan di-commit
+            max_batch_size: Jumlah pesan maksimal per transaksi
+            max_buffer: Jumlah pesan maksimal yang menunggu di memori
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_buffer)
+        self._closed = False
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Koneksi khusus writer; dibuat di sini agar error skema langsung terlihat
+        self._write_conn = self._connect()
+        self._write_conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_conversation
+                ON messages(conversation_id, id);
+            """
+        )
+        self._write_conn.commit()
+
+        self._writer = threading.Thread(target=self._run_writer, name="conversation-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def new_conversation_id() -> str:
+        """
+        Buat id percakapan baru
+        """
+        return uuid.uuid4().hex
+
+    def append(self, conversation_id: str, role: str, message: str):
+        """
+        Tambahkan pesan ke buffer (tidak menunggu penulisan ke disk)
+
+        Args:
+            conversation_id: Id percakapan
+            role: 'user' atau 'assistant'
+            message: Isi pesan
+
+        TypeError jika argumen bukan string, ValueError jika conversation_id kosong.
+        """
+        if self._closed:
+            raise RuntimeError("ConversationStore sudah ditutup")
+        # Satu baris yang tidak valid bisa menggagalkan seluruh batch milik user lain
+        for name, value in (("conversation_id", conversation_id), ("role", role), ("message", message)):
+            if not isinstance(value, str):
+                raise TypeError(f"{name} harus berupa string, bukan {type(value).__name__}")
+        if not conversation_id:
+            raise ValueError("conversation_id tidak boleh kosong")
+        self._queue.put((conversation_id, role, message, time.time()))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Tunggu sampai semua pesan yang sudah di-append tersimpan di database
+
+        Returns:
+            True jika selesai sebelum timeout
+        """
+        if self._closed or not self._writer.is_alive():
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def get_history(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Ambil riwayat percakapan (urut dari pesan terlama)
+
+        Args:
+            conversation_id: Id percakapan
+            limit: Hanya ambil N pesan terakhir (opsional)
+
+        Returns:
+            List of dict berisi role, message, dan created_at
+        """
+        self.flush()
+        conn = self._connect()
+        try:
+            if limit:
+                rows = conn.execute(
+                    "SELECT role, message, created_at FROM ("
+                    " SELECT id, role, message, created_at FROM messages"
+                    " WHERE conversation_id = ? ORDER BY id DESC LIMIT ?"
+                    ") ORDER BY id ASC",
+                    (conversation_id, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT role, message, created_at FROM messages WHERE conversation_id = ? ORDER BY id",
+                    (conversation_id,),
+                ).fetchall()
+        finally:
+            conn.close()
+
+        return [{"role": role, "message": message, "created_at": created_at} for role, message, created_at in rows]
+
+    def _insert(self, rows: List[tuple]) -> Optional[sqlite3.Error]:
+        """
+        Tulis baris dalam satu transaksi; ulangi jika database sedang dikunci
+
+        Returns:
+            None jika berhasil, error terakhir jika gagal
+        """
+        error = None
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with self._write_conn:
+                    self._write_conn.executemany(_INSERT_SQL, rows)
+                return None
+            except sqlite3.OperationalError as e:
+                error = e
+                time.sleep(WRITE_RETRY_DELAY * (attempt + 1))
+            except sqlite3.Error as e:
+                # Error data (misalnya tipe parameter) tidak akan berhasil jika diulang
+                return e
+        return error
+
+    def _write_batch(self, batch: List[tuple]):
+        error = self._insert(batch)
+        if error is None:
+            return
+
+        # Tulis per baris agar hanya baris yang bermasalah yang hilang
+        print(f"Error saat menyimpan batch percakapan ({error}), menyimpan per pesan...")
+        for row in batch:
+            error = self._insert([row])
+            if error is not None:
+                print(f"Error saat menyimpan pesan percakapan {row[0]!r}: {error}")
+
+    def _run_writer(self):
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch: List[tuple] = []
+            waiters: List[_FlushRequest] = []
+            deadline = time.monotonic() + self.flush_interval
+
+            # Kumpulkan pesan sampai batch penuh, ada permintaan flush, atau interval habis
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, _FlushRequest):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch_size:
+                    break
+
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.done.set()
+
+    def close(self):
+        """
+        Tulis semua pesan yang tersisa lalu hentikan writer
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._write_conn.close()
+
+
+_default_store: Optional[ConversationStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> ConversationStore:
+    """
+    Conversation store bersama untuk proses ini (dipakai Streamlit dan CLI).
+    Path database diatur lewat CONVERSATIONS_DB_PATH dan interval flush
+    lewat CONVERSATIONS_FLUSH_INTERVAL.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ConversationStore(
+                db_path=os.getenv("CONVERSATIONS_DB_PATH", "conversations.db"),
+                flush_interval=float(os.getenv("CONVERSATIONS_FLUSH_INTERVAL", "1.0")),
+            )
+        return _default_store
@@ -0,0 +1,180 @@
+"""
+Near-Duplicate Detection
+Deteksi chunk yang hampir identik dengan MinHash + LSH (banding) sebelum
+chunk dimasukkan ke vector store
+"""
+
+import hashlib
+import re
+import struct
+from typing import Dict, List, Set, Tuple
+
+from langchain.schema import Document
+
+
+# Bilangan prima Mersenne untuk hashing universal (a * x + b) mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHashDeduplicator:
+    """
+    Gabungkan chunk yang hampir sama berdasarkan containment atas shingle kata:
+    |A ∩ B| / min(|A|, |B|). Berbeda dengan Jaccard, skor ini tetap tinggi jika
+    chunk pendek (mis. sisa potongan splitter) hampir seluruhnya termuat di
+    chunk lain. Kandidat pasangan dicari dengan LSH banding atas MinHash, lalu
+    diverifikasi dengan containment yang sebenarnya.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 64,
+                 shingle_size: int = 3, seed: int = 1):
+        """
+        Inisialisasi deduplicator
+
+        Args:
+            threshold: Containment minimum agar dua chunk dianggap duplikat
+            num_perm: Jumlah fungsi hash MinHash
+            bands: Jumlah band LSH (num_perm harus habis dibagi bands). Band
+                kecil (2 baris) menjaring pasangan dengan Jaccard rendah tetapi
+                containment tinggi; false positive disaring saat verifikasi
+            shingle_size: Jumlah kata per shingle
+            seed: Seed untuk parameter hash (deterministik antar proses)
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm harus habis dibagi bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Parameter (a, b) deterministik untuk setiap permutasi
+        self._params: List[Tuple[int, int]] = []
+        for i in range(num_perm):
+            digest = hashlib.sha256(f"{seed}:{i}".encode()).digest()
+            a, b = struct.unpack("<QQ", digest[:16])
+            self._params.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+
+    def shingles(self, text: str) -> Set[int]:
+        """
+        Ubah teks menjadi set hash shingle kata (case-insensitive)
+        """
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < self.shingle_size:
+            words_iter = [" ".join(words)] if words else []
+        else:
+            words_iter = (
+                " ".join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            )
+
+        return {
+            struct.unpack("<I", hashlib.blake2b(shingle.encode(), digest_size=4).digest())[0]
+            for shingle in words_iter
+        }
+
+    def signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        """
+        Hitung signature MinHash dari set shingle
+        """
+        if not shingles:
+            return tuple([_MAX_HASH] * self.num_perm)
+
+        return tuple(
+            min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in shingles)
+            for a, b in self._params
+        )
+
+    @staticmethod
+    def containment(a: Set[int], b: Set[int]) -> float:
+        if not a or not b:
+            return 1.0 if a == b else 0.0
+        return len(a & b) / min(len(a), len(b))
+
+    def find_clusters(self, texts: List[str]) -> List[List[int]]:
+        """
+        Kelompokkan index teks yang hampir duplikat
+
+        Args:
+            texts: List teks chunk
+
+        Returns:
+            List cluster (list index), urut berdasarkan kemunculan pertama.
+            Anggota pertama setiap cluster adalah teks terpanjang (representatif).
+        """
+        shingle_sets = [self.shingles(text) for text in texts]
+        signatures = [self.signature(s) for s in shingle_sets]
+
+        # Union-find untuk menggabungkan pasangan duplikat
+        parent = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        checked: Set[Tuple[int, int]] = set()
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets: Dict[Tuple[int, ...], List[int]] = {}
+            for idx, sig in enumerate(signatures):
+                buckets.setdefault(sig[start:start + self.rows], []).append(idx)
+
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                for pos, i in enumerate(members):
+                    for j in members[pos + 1:]:
+                        if (i, j) in checked:
+                            continue
+                        checked.add((i, j))
+                        if self.containment(shingle_sets[i], shingle_sets[j]) >= self.threshold:
+                            root_i, root_j = find(i), find(j)
+                            if root_i != root_j:
+                                # Root selalu index terkecil agar chunk pertama dipertahankan
+                                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        clusters: Dict[int, List[int]] = {}
+        for idx in range(len(texts)):
+            clusters.setdefault(find(idx), []).append(idx)
+
+        # Chunk terpanjang jadi representatif agar teks chunk yang termuat tidak hilang
+        result = []
+        for members in sorted(clusters.values(), key=lambda members: members[0]):
+            longest = max(members, key=lambda idx: len(texts[idx]))
+            result.append([longest] + [idx for idx in members if idx != longest])
+        return result
+
+    def deduplicate(self, documents: List[Document]) -> List[Document]:
+        """
+        Gabungkan chunk hampir duplikat menjadi satu chunk representatif
+        (chunk terpanjang di cluster).
+        Semua sumber dicatat di metadata 'sources' (dipisah ';') dan jumlah
+        chunk yang digabung di 'duplicate_count'.
+
+        Args:
+            documents: List of Document chunks
+
+        Returns:
+            List of Document tanpa near-duplicate
+        """
+        clusters = self.find_clusters([doc.page_content for doc in documents])
+
+        result = []
+        for members in clusters:
+            representative = documents[members[0]]
+            sources = []
+            for idx in members:
+                source = documents[idx].metadata.get("source", "Unknown")
+                if source not in sources:
+                    sources.append(source)
+
+            metadata = dict(representative.metadata)
+            # Metadata Chroma hanya menerima nilai skalar
+            metadata["sources"] = ";".join(sources)
+            metadata["duplicate_count"] = len(members)
+            result.append(Document(page_content=representative.page_content, metadata=metadata))
+
+        return result
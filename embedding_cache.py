@@ -0,0 +1,249 @@
+"""
+Embedding Cache
+Cache embedding di disk berbasis content hash (model + teks chunk) yang bisa
+dipakai bersama oleh semua vector store saat index dibangun ulang
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_DIRECTORY = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache")
+DEFAULT_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+
+
+class EmbeddingCache:
+    """
+    Penyimpanan vektor di SQLite dengan format float32 biner dan eviction
+    berbasis ukuran (least recently used). Total ukuran vektor disimpan di
+    tabel cache_size yang diperbarui trigger dalam transaksi yang sama,
+    sehingga tetap benar jika cache dipakai beberapa proses sekaligus dan
+    put_many tidak perlu menjumlahkan seluruh tabel.
+    """
+
+    def __init__(self, cache_directory: str = DEFAULT_CACHE_DIRECTORY, max_size_mb: float = DEFAULT_CACHE_MAX_MB):
+        """
+        Inisialisasi cache
+
+        Args:
+            cache_directory: Folder untuk file cache
+            max_size_mb: Batas ukuran total vektor dalam MB sebelum eviction
+        """
+        os.makedirs(cache_directory, exist_ok=True)
+        self.path = os.path.join(cache_directory, "embeddings.sqlite3")
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._init_size_counter()
+
+    def _init_size_counter(self):
+        # BEGIN IMMEDIATE: hanya satu proses yang menghitung total awal
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_size (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_bytes INTEGER NOT NULL
+                )
+                """
+            )
+            for statement in (
+                """
+                CREATE TRIGGER IF NOT EXISTS embeddings_size_insert AFTER INSERT ON embeddings
+                BEGIN UPDATE cache_size SET total_bytes = total_bytes + LENGTH(NEW.vector) WHERE id = 1; END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS embeddings_size_delete AFTER DELETE ON embeddings
+                BEGIN UPDATE cache_size SET total_bytes = total_bytes - LENGTH(OLD.vector) WHERE id = 1; END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS embeddings_size_update AFTER UPDATE OF vector ON embeddings
+                BEGIN UPDATE cache_size
+                      SET total_bytes = total_bytes + LENGTH(NEW.vector) - LENGTH(OLD.vector) WHERE id = 1; END
+                """,
+            ):
+                self._conn.execute(statement)
+            # Cache lama (dibuat sebelum ada counter): hitung total sekali saja
+            if self._conn.execute("SELECT 1 FROM cache_size WHERE id = 1").fetchone() is None:
+                self._conn.execute(
+                    "INSERT INTO cache_size (id, total_bytes)"
+                    " SELECT 1, COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+                )
+            self._conn.commit()
+        except sqlite3.Error:
+            self._conn.rollback()
+            raise
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> bytes:
+        """
+        Buat key cache dari nama model dan hash teks
+        """
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """
+        Ambil vektor untuk daftar key yang ada di cache
+
+        Args:
+            keys: List of cache key
+
+        Returns:
+            Dict key -> vektor untuk key yang ditemukan
+        """
+        found: Dict[bytes, List[float]] = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            # Batasi jumlah parameter per query (limit SQLite 999)
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[bytes(key)] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, model_name: str, items: Dict[bytes, List[float]]):
+        """
+        Simpan vektor baru ke cache lalu jalankan eviction bila perlu
+
+        Args:
+            model_name: Nama model embedding
+            items: Dict key -> vektor
+        """
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            # Upsert, bukan INSERT OR REPLACE: delete implisit dari REPLACE
+            # tidak menjalankan trigger sehingga counter ukuran akan salah
+            self._conn.executemany(
+                "INSERT INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET model = excluded.model, vector = excluded.vector,"
+                " last_used = excluded.last_used",
+                [(key, model_name, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self._conn.commit()
+            self._evict()
+
+    def size_bytes(self) -> int:
+        """
+        Total ukuran vektor yang tersimpan (dalam byte)
+        """
+        with self._lock:
+            return self._size_bytes()
+
+    def _size_bytes(self) -> int:
+        row = self._conn.execute("SELECT total_bytes FROM cache_size WHERE id = 1").fetchone()
+        return int(row[0])
+
+    def _evict(self):
+        size = self._size_bytes()
+        if size <= self.max_bytes:
+            return
+
+        # Hapus entry yang paling lama tidak dipakai sampai tersisa 90% dari batas
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        to_delete = []
+        for key, length in rows:
+            if size <= target:
+                break
+            to_delete.append((key,))
+            size -= length
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", to_delete)
+        self._conn.commit()
+        print(f"Embedding cache: {len(to_delete)} entry dihapus (eviction)")
+
+    def close(self):
+        """
+        Tutup koneksi database
+        """
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrapper Embeddings yang memeriksa EmbeddingCache sebelum memanggil model.
+    Hanya embed_documents yang di-cache; embed_query diteruskan langsung.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        """
+        Args:
+            embeddings: Model embedding yang dibungkus
+            cache: EmbeddingCache yang dipakai
+            model_name: Nama model (bagian dari key cache)
+        """
+        # Seperti embedding server: tolak model yang berbeda dari key cache,
+        # jika tidak vektor model lain tersimpan di bawah nama model ini
+        actual_model = getattr(embeddings, "model_name", None)
+        if actual_model and actual_model != model_name:
+            raise ValueError(f"Embeddings memakai model {actual_model}, bukan {model_name}")
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.make_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys)))
+
+        # Embed hanya teks yang belum ada di cache (teks identik cukup sekali)
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model_name, computed)
+            vectors.update(computed)
+
+        print(f"Embedding cache: {len(texts) - len(missing)} hit, {len(missing)} miss")
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,425 @@
+"""
+Embedding Server
+Layanan embedding lokal melalui Unix socket: model dimuat sekali dan
+request dari banyak klien digabung menjadi micro-batch
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+DEFAULT_SOCKET_PATH = os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/chatbot_rag_embeddings.sock")
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Header pesan: panjang payload JSON (4 byte, big-endian)
+_HEADER = struct.Struct(">I")
+
+
+def _encode(payload: dict) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+def rss_mb() -> float:
+    """
+    Resident set size proses ini dalam MB (Linux: /proc, lainnya: puncak RSS)
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def socket_in_use(socket_path: str) -> bool:
+    """
+    Cek apakah ada server yang masih menjawab di socket_path
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return False
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(1.0)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        # File socket sisa server yang sudah mati
+        return False
+    finally:
+        sock.close()
+
+
+class MicroBatcher:
+    """
+    Kumpulkan request embed dari banyak koneksi lalu jalankan model
+    sekali per batch (maksimal max_batch_size teks atau max_wait_ms)
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+        # Model dijalankan di satu thread agar tidak ada inferensi paralel
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            all_texts = [text for texts, _ in pending for text in texts]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self.embeddings.embed_documents, all_texts)
+            except Exception as e:
+                if len(pending) == 1:
+                    if not pending[0][1].done():
+                        pending[0][1].set_exception(e)
+                    continue
+                # Satu request yang bermasalah tidak boleh menggagalkan request lain
+                # di batch yang sama: ulangi per request
+                print(f"Batch embedding gagal ({e}), mengulang per request...")
+                for texts, future in pending:
+                    await self._embed_single(texts, future)
+                continue
+
+            self.batches += 1
+            self.texts += len(all_texts)
+            offset = 0
+            for texts, future in pending:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    async def _embed_single(self, texts: List[str], future: asyncio.Future):
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(self.executor, self.embeddings.embed_documents, texts)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        if not future.done():
+            future.set_result(vectors)
+
+
+class EmbeddingServer:
+    """
+    Server asyncio di Unix socket yang melayani request embed dan info
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, model_name: str = DEFAULT_MODEL,
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batcher: Optional[MicroBatcher] = None
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = _HEADER.unpack(header)
+                request = json.loads(await reader.readexactly(length))
+
+                op = request.get("op") if isinstance(request, dict) else None
+                if op == "embed":
+                    texts = request.get("texts")
+                    # Validasi sebelum masuk antrian: string akan ter-embed per karakter
+                    # dan item non-string menggagalkan seluruh micro-batch
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        response = {"error": "Field 'texts' harus berupa list string"}
+                    elif not texts:
+                        response = {"vectors": []}
+                    else:
+                        try:
+                            response = {"vectors": await self.batcher.embed(texts)}
+                        except Exception as e:
+                            response = {"error": str(e)}
+                elif op == "info":
+                    response = {
+                        "model": self.model_name,
+                        "pid": os.getpid(),
+                        "batches": self.batcher.batches,
+                        "texts": self.batcher.texts,
+                        "rss_mb": round(rss_mb(), 1),
+                    }
+                else:
+                    response = {"error": f"Operasi tidak dikenal: {op}"}
+
+                writer.write(_encode(response))
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            print(f"Koneksi klien ditutup: {e}")
+        finally:
+            writer.close()
+
+    async def serve(self) -> bool:
+        """
+        Muat model lalu layani request sampai dihentikan
+
+        Returns:
+            False jika socket sudah dipakai server lain
+        """
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        # Jangan ambil alih socket milik server lain yang masih berjalan
+        if socket_in_use(self.socket_path):
+            print(f"Embedding server lain sudah berjalan di {self.socket_path}")
+            return False
+
+        print(f"Memuat model {self.model_name}...")
+        embeddings = HuggingFaceEmbeddings(model_name=self.model_name)
+        # Warm-up agar request pertama tidak menanggung biaya inisialisasi
+        embeddings.embed_documents(["warm-up"])
+
+        self.batcher = MicroBatcher(embeddings, self.max_batch_size, self.max_wait_ms)
+        batcher_task = asyncio.create_task(self.batcher.run())
+
+        if socket_in_use(self.socket_path):
+            batcher_task.cancel()
+            print(f"Embedding server lain sudah berjalan di {self.socket_path}")
+            return False
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        print(f"=== Embedding server siap di {self.socket_path} "
+              f"(batch {self.max_batch_size}, max wait {self.max_wait_ms} ms) ===")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        return True
+
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Klien Embeddings untuk EmbeddingServer. Setiap thread memakai koneksi
+    sendiri sehingga aman dipanggil secara paralel. Jika server hilang dan
+    fallback_factory diisi, model lokal dimuat sekali lalu dipakai untuk
+    semua panggilan berikutnya di proses ini.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 60.0,
+                 fallback_factory: Optional[Callable[[], Embeddings]] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback_factory = fallback_factory
+        self._fallback: Optional[Embeddings] = None
+        self._fallback_lock = threading.Lock()
+        self._local = threading.local()
+        self.model_name = self._call({"op": "info"})["model"]
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _recv_exact(self, sock: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Koneksi ke embedding server terputus")
+            data += chunk
+        return data
+
+    def _call(self, payload: dict) -> dict:
+        # Coba sekali lagi dengan koneksi baru jika koneksi lama sudah putus
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            try:
+                if sock is None:
+                    sock = self._local.sock = self._connect()
+                sock.sendall(_encode(payload))
+                (length,) = _HEADER.unpack(self._recv_exact(sock, _HEADER.size))
+                response = json.loads(self._recv_exact(sock, length))
+                break
+            except (OSError, ConnectionError):
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt == 1:
+                    raise
+
+        if "error" in response:
+            raise RuntimeError(f"Embedding server error: {response['error']}")
+        return response
+
+    def _local_embeddings(self) -> Embeddings:
+        with self._fallback_lock:
+            if self._fallback is None:
+                print(f"Embedding server {self.socket_path} tidak tersedia, memuat model lokal...")
+                self._fallback = self.fallback_factory()
+            return self._fallback
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._fallback is None:
+            try:
+                return self._call({"op": "embed", "texts": texts})["vectors"]
+            except OSError:
+                if self.fallback_factory is None:
+                    raise
+        return self._local_embeddings().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def connect_embedding_server(socket_path: str = DEFAULT_SOCKET_PATH,
+                             model_name: Optional[str] = None,
+                             fallback_factory: Optional[Callable[[], Embeddings]] = None
+                             ) -> Optional[RemoteEmbeddings]:
+    """
+    Hubungkan ke embedding server jika tersedia
+
+    Args:
+        socket_path: Path Unix socket server
+        model_name: Jika diisi, server hanya dipakai bila memuat model yang sama
+        fallback_factory: Pembuat model lokal yang dipakai jika server hilang
+            setelah terhubung
+
+    Returns:
+        RemoteEmbeddings atau None jika server tidak tersedia
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+
+    try:
+        remote = RemoteEmbeddings(socket_path, fallback_factory=fallback_factory)
+    except (OSError, ConnectionError, RuntimeError, ValueError) as e:
+        print(f"Embedding server di {socket_path} tidak dapat dihubungi: {e}")
+        return None
+
+    if model_name and remote.model_name != model_name:
+        print(f"Embedding server memuat model {remote.model_name}, bukan {model_name}")
+        return None
+
+    print(f"Menggunakan embedding server di {socket_path}")
+    return remote
+
+
+def run_benchmark(socket_path: str, clients: int, requests_per_client: int, workers: int = 4):
+    """
+    Bandingkan throughput query embedding (model lokal satu per satu vs
+    embedding server dengan banyak klien paralel) dan perkiraan total RSS
+    untuk `workers` proses dengan dan tanpa server
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    texts = [f"Pertanyaan benchmark nomor {i} tentang Reina Mishima" for i in range(clients * requests_per_client)]
+
+    rss_before = rss_mb()
+    local = HuggingFaceEmbeddings(model_name=DEFAULT_MODEL)
+    local.embed_query("warm-up")
+    # Memori tambahan yang ditanggung setiap proses yang memuat model sendiri
+    model_rss = rss_mb() - rss_before
+    start = time.perf_counter()
+    for text in texts:
+        local.embed_query(text)
+    local_rate = len(texts) / (time.perf_counter() - start)
+
+    remote = connect_embedding_server(socket_path)
+    if remote is None:
+        print("Embedding server tidak tersedia, jalankan `python embedding_server.py` terlebih dahulu")
+        return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(remote.embed_query, texts))
+    remote_rate = len(texts) / (time.perf_counter() - start)
+
+    info = remote._call({"op": "info"})
+    print("\n=== Benchmark Embedding ===")
+    print(f"Lokal, sekuensial        : {local_rate:.1f} query/s")
+    print(f"Server, {clients} klien paralel : {remote_rate:.1f} query/s")
+    print(f"Rata-rata ukuran batch   : {info['texts'] / max(1, info['batches']):.1f}")
+    print(f"\nRSS model per proses     : {model_rss:.0f} MB")
+    print(f"RSS embedding server     : {info['rss_mb']:.0f} MB")
+    print(f"Total RSS model, {workers} worker : {workers * model_rss:.0f} MB tanpa server, "
+          f"{info['rss_mb']:.0f} MB dengan server")
+
+
+def main():
+    """
+    Entry point CLI untuk embedding server
+    """
+    parser = argparse.ArgumentParser(description="Embedding server dengan micro-batching")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path Unix socket")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--bench", action="store_true", help="Benchmark terhadap server yang sedang berjalan")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=32, help="Request per klien saat benchmark")
+    parser.add_argument("--workers", type=int, default=4, help="Jumlah proses untuk perkiraan RSS")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(args.socket, args.clients, args.requests, args.workers)
+        return
+
+    server = EmbeddingServer(args.socket, args.model, args.max_batch_size, args.max_wait_ms)
+    try:
+        if not asyncio.run(server.serve()):
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nEmbedding server dihentikan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Index Versioning
+Versi index (vector store) dengan reference counting untuk atomic swap,
+pointer versi aktif di disk, dan watcher folder dokumen.
+
+Index dipakai bersama oleh beberapa proses (worker chat_server, Streamlit,
+CLI), jadi folder versi lama tidak dihapus oleh refcount satu proses saja:
+proses yang me-rebuild menandai versi lama sebagai retired, proses pembaca
+membaca ulang CURRENT paling lambat setiap CURRENT_CHECK_INTERVAL detik dan
+pindah ke versi baru, dan folder versi lama baru dihapus setelah
+VERSION_GRACE_PERIOD detik.
+"""
+
+import glob
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Jeda minimal antar pengecekan pointer CURRENT oleh proses pembaca
+CURRENT_CHECK_INTERVAL = 2.0
+
+# Umur minimal (detik) tanda retired sebelum folder versi lama dihapus;
+# harus jauh lebih besar dari CURRENT_CHECK_INTERVAL + durasi query terlama
+VERSION_GRACE_PERIOD = 60.0
+
+_RETIRED_SUFFIX = ".retired"
+
+# Jumlah IndexVersion per path di proses ini. Chroma menyimpan satu System
+# per path secara global, jadi System baru ditutup saat referensi terakhir dilepas
+_client_refs: Dict[str, int] = {}
+_client_refs_lock = threading.Lock()
+
+
+def _retain_client(path: str):
+    with _client_refs_lock:
+        _client_refs[path] = _client_refs.get(path, 0) + 1
+
+
+def _release_client(vectorstore, path: str):
+    with _client_refs_lock:
+        _client_refs[path] -= 1
+        if _client_refs[path] > 0:
+            return
+        del _client_refs[path]
+    close_vectorstore(vectorstore, path)
+
+
+def close_vectorstore(vectorstore, path: str):
+    """
+    Keluarkan System milik path ini dari cache SharedSystemClient Chroma lalu
+    hentikan (clear_system_cache() akan menutup semua index, termasuk versi aktif)
+    """
+    client = getattr(vectorstore, "_client", None)
+    identifier = getattr(client, "_identifier", None)
+    if client is None or identifier is None:
+        return
+    system = client._identifier_to_system.pop(identifier, None)
+    if system is not None:
+        try:
+            system.stop()
+        except Exception as e:
+            print(f"Error saat menutup index {path}: {e}")
+
+
+def has_domain_metadata(vectorstore) -> bool:
+    """
+    Cek apakah chunk di vector store sudah punya metadata domain
+    (index lama hanya menyimpan metadata source)
+    """
+    try:
+        metadatas = vectorstore.get(limit=1, include=["metadatas"])["metadatas"]
+    except Exception:
+        return False
+    return bool(metadatas) and "domain" in (metadatas[0] or {})
+
+
+class IndexVersion:
+    """
+    Satu versi vector store beserta jumlah query yang sedang memakainya.
+    Setelah diganti (retired) dan tidak ada query yang memakainya lagi,
+    client Chroma-nya ditutup dengan release(). Folder di disk dihapus
+    terpisah oleh collect_versions().
+    """
+
+    def __init__(self, vectorstore, path: str):
+        self.vectorstore = vectorstore
+        self.path = path
+        self.in_flight = 0
+        self.retired = False
+        # Dicek sekali saat dimuat agar query ke index lama tidak memakai filter
+        self.filterable = has_domain_metadata(vectorstore)
+        _retain_client(path)
+
+    def should_release(self) -> bool:
+        return self.retired and self.in_flight == 0 and self.vectorstore is not None
+
+    def release(self):
+        """
+        Tutup client Chroma versi ini
+        """
+        vectorstore, self.vectorstore = self.vectorstore, None
+        _release_client(vectorstore, self.path)
+
+
+def versions_directory(persist_directory: str) -> str:
+    """
+    Folder tempat semua versi hasil rebuild disimpan
+    """
+    return f"{persist_directory.rstrip(os.sep)}_versions"
+
+
+def read_current_version(persist_directory: str) -> Optional[str]:
+    """
+    Baca path versi aktif dari file pointer CURRENT
+
+    Returns:
+        Path versi aktif, atau None jika belum ada rebuild
+    """
+    pointer = os.path.join(versions_directory(persist_directory), "CURRENT")
+    try:
+        with open(pointer, encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+
+    path = os.path.join(versions_directory(persist_directory), name)
+    return path if name and os.path.isdir(path) else None
+
+
+def write_current_version(persist_directory: str, version_path: str):
+    """
+    Tulis pointer versi aktif secara atomik (tulis file sementara lalu rename)
+    """
+    directory = versions_directory(persist_directory)
+    tmp_pointer = os.path.join(directory, "CURRENT.tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(version_path))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(directory, "CURRENT"))
+
+
+def mark_retired(version_path: str):
+    """
+    Tandai versi sebagai retired (waktu penandaan = mtime file penanda)
+    """
+    with open(version_path + _RETIRED_SUFFIX, "w", encoding="utf-8") as f:
+        f.write(f"{time.time()}\n")
+
+
+def collect_versions(persist_directory: str, grace_period: float = VERSION_GRACE_PERIOD,
+                     in_use: Iterable[str] = ()) -> List[str]:
+    """
+    Hapus folder versi yang sudah retired lebih dari grace_period detik,
+    kecuali versi aktif di CURRENT dan versi yang masih dipakai proses ini
+
+    Args:
+        persist_directory: Folder index utama
+        grace_period: Umur minimal tanda retired dalam detik
+        in_use: Path versi yang masih terbuka di proses ini
+
+    Returns:
+        List path versi yang dihapus
+    """
+    current = read_current_version(persist_directory)
+    in_use = set(in_use)
+    removed = []
+    for marker in glob.glob(os.path.join(versions_directory(persist_directory), "*" + _RETIRED_SUFFIX)):
+        path = marker[:-len(_RETIRED_SUFFIX)]
+        if path == current or path in in_use:
+            continue
+        try:
+            if time.time() - os.path.getmtime(marker) < grace_period:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            os.remove(marker)
+        except FileNotFoundError:
+            # Sudah dihapus oleh proses lain
+            continue
+        removed.append(path)
+        print(f"Index versi lama dihapus: {path}")
+    return removed
+
+
+def new_version_path(persist_directory: str) -> str:
+    """
+    Buat path folder untuk versi baru (berdasarkan timestamp)
+    """
+    directory = versions_directory(persist_directory)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"v{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000:06d}")
+
+
+class DocumentsWatcher:
+    """
+    Thread yang memantau perubahan file di folder dokumen (polling mtime/ukuran)
+    dan memanggil callback setelah perubahan stabil selama satu interval
+    """
+
+    def __init__(self, documents_path: str, on_change: Callable[[], object],
+                 interval: float = 5.0, pattern: str = "**/*.txt"):
+        """
+        Args:
+            documents_path: Folder dokumen yang dipantau
+            on_change: Fungsi yang dipanggil saat ada perubahan
+            interval: Jeda polling dalam detik
+            pattern: Pola glob file yang dipantau
+        """
+        self.documents_path = documents_path
+        self.on_change = on_change
+        self.interval = interval
+        self.pattern = pattern
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> Dict[str, Tuple[float, int]]:
+        result = {}
+        for path in glob.glob(os.path.join(self.documents_path, self.pattern), recursive=True):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            result[path] = (stat.st_mtime, stat.st_size)
+        return result
+
+    def _run(self):
+        last = self.snapshot()
+        pending = None
+        while not self._stop.wait(self.interval):
+            current = self.snapshot()
+            if current != last:
+                # Tunggu satu interval lagi sampai file selesai ditulis
+                pending = current
+                last = current
+                continue
+
+            if pending is not None:
+                pending = None
+                print("Perubahan dokumen terdeteksi, membangun ulang index...")
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"Error saat membangun ulang index: {e}")
+
+    def start(self) -> "DocumentsWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="documents-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
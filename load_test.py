@@ -0,0 +1,134 @@
+"""
+Load Generator untuk Chat Server
+Mengukur requests/sec chat_server.py untuk beberapa jumlah worker
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from chat_server import ChatbotClient
+
+
+DEFAULT_QUESTIONS = [
+    "Apa itu Python?",
+    "Apa keunggulan Python?",
+    "Siapa itu Reina Mishima?",
+    "Apa itu Purple Lightning?",
+    "Ceritakan tentang Devil Gene dalam keluarga Mishima",
+    "Framework apa saja untuk web development Python?",
+]
+
+
+def wait_until_ready(client: ChatbotClient, timeout: float = 300.0) -> bool:
+    """
+    Tunggu sampai server siap atau timeout
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.is_ready():
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def run_load(client: ChatbotClient, total_requests: int, concurrency: int,
+             endpoint: str = "chat") -> Dict[str, float]:
+    """
+    Kirim request secara konkuren dan hitung throughput
+
+    Args:
+        client: Klien chat server
+        total_requests: Jumlah total request
+        concurrency: Jumlah request paralel
+        endpoint: 'chat' atau 'search'
+
+    Returns:
+        Dict berisi rps, latency p50/p95 (ms), dan jumlah error
+    """
+    def one(i: int) -> float:
+        question = DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)]
+        start = time.perf_counter()
+        if endpoint == "search":
+            client.search(question, k=3)
+        else:
+            client.chat(question)
+        return (time.perf_counter() - start) * 1000
+
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(one, i) for i in range(total_requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    def percentile(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    return {
+        "rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "errors": errors,
+    }
+
+
+def main():
+    """
+    Jalankan chat server untuk setiap jumlah worker dan ukur throughput
+    """
+    parser = argparse.ArgumentParser(description="Load test untuk chat_server.py")
+    parser.add_argument("--workers", default="1,2,4", help="Daftar jumlah worker, dipisah koma")
+    parser.add_argument("--requests", type=int, default=200, help="Total request per putaran")
+    parser.add_argument("--concurrency", type=int, default=16, help="Request paralel dari klien")
+    parser.add_argument("--endpoint", choices=["chat", "search"], default="chat")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    client = ChatbotClient(base_url)
+    results = []
+
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        print(f"\n=== {workers} worker ===")
+        server = subprocess.Popen(
+            [sys.executable, "chat_server.py", "--port", str(args.port), "--workers", str(workers)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        try:
+            if not wait_until_ready(client):
+                print("Server tidak siap, putaran dilewati")
+                continue
+
+            # Beri waktu semua worker menyelesaikan warm-up
+            time.sleep(2)
+            run_load(client, min(20, args.requests), args.concurrency, args.endpoint)
+            stats = run_load(client, args.requests, args.concurrency, args.endpoint)
+            results.append((workers, stats))
+            print(f"{stats['rps']:.1f} req/s, p50 {stats['p50_ms']:.1f} ms, "
+                  f"p95 {stats['p95_ms']:.1f} ms, error {stats['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    print("\n=== Ringkasan ===")
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'errors':>8}")
+    for workers, stats in results:
+        print(f"{workers:>8} {stats['rps']:>10.1f} {stats['p50_ms']:>10.1f} "
+              f"{stats['p95_ms']:>10.1f} {stats['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
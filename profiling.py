@@ -0,0 +1,332 @@
+"""
+Profiling Mode
+Profil CPU (cProfile + sampling stack untuk flamegraph) dan alokasi memori
+(tracemalloc) untuk tahap ingest dan query. Aktif lewat --profile di CLI
+atau environment variable CHATBOT_PROFILE=1.
+"""
+
+import atexit
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+PROFILE_ENV = "CHATBOT_PROFILE"
+PROFILE_DIR_ENV = "CHATBOT_PROFILE_DIR"
+
+# Alokasi milik tracemalloc dan profiler sendiri tidak dilaporkan
+_IGNORED_FILES = {tracemalloc.__file__, __file__}
+
+
+class Profiler:
+    """
+    Kumpulkan profil per tahap (stage). Tahap bisa bersarang, misalnya
+    search_documents di dalam generate_response.
+
+    Output di folder profil:
+        cpu.folded          : stack hasil sampling wall-clock (format folded
+                              untuk flamegraph.pl, speedscope, atau inferno)
+        cpu_<stage>.prof    : statistik cProfile (snakeviz / python -m pstats)
+        memory_top.txt      : top-N lokasi alokasi yang tumbuh per tahap
+        summary.txt         : jumlah panggilan dan waktu per tahap
+
+    Pertumbuhan memori setiap panggilan dicatat lewat get_traced_memory()
+    (murah). Perbandingan snapshot per lokasi kode mahal (sebanding dengan
+    jumlah alokasi hidup), jadi hanya dilakukan untuk `snapshot_calls`
+    panggilan pertama setiap tahap; memory_top.txt juga memuat top-N
+    alokasi yang masih hidup saat dump untuk melihat pertumbuhan jangka panjang.
+    Waktu yang dipakai snapshot tidak dihitung dalam waktu tahap mana pun
+    (termasuk tahap luar dari tahap yang di-snapshot).
+    Snapshot tracemalloc mencakup semua thread, sehingga pada pemakaian
+    konkuren selisih memori suatu tahap bisa ikut memuat alokasi thread lain.
+    """
+
+    def __init__(self, output_dir: str = "profiles", sample_interval: float = 0.005,
+                 top_n: int = 25, snapshot_calls: int = 3, trace_frames: int = 1):
+        """
+        Args:
+            output_dir: Folder induk untuk hasil profil
+            sample_interval: Jeda sampling stack dalam detik
+            top_n: Jumlah lokasi alokasi teratas per tahap
+            snapshot_calls: Jumlah panggilan pertama per tahap yang dibandingkan per lokasi kode
+            trace_frames: Kedalaman traceback yang disimpan tracemalloc
+        """
+        self.output_dir = os.path.join(output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.snapshot_calls = snapshot_calls
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._active_threads: Dict[int, Tuple[str, ...]] = {}
+        self._folded: Dict[str, int] = {}
+        self._cpu_stats: Dict[str, pstats.Stats] = {}
+        self._memory: Dict[str, Dict[str, List[int]]] = {}
+        self._memory_growth: Dict[str, List[int]] = {}
+        self._timings: Dict[str, List[float]] = {}
+        self._started: Dict[str, int] = {}
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(trace_frames)
+
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run_sampler, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+
+    def _stage_stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+            self._local.hidden_seconds = 0.0
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profil satu tahap eksekusi
+        """
+        stack = self._stage_stack()
+        stack.append(name)
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active_threads[thread_id] = tuple(stack)
+            self._started[name] = self._started.get(name, 0) + 1
+            take_snapshot = self._started[name] <= self.snapshot_calls
+
+        before = None
+        if take_snapshot:
+            with self._hidden():
+                before = tracemalloc.take_snapshot()
+        memory_before = tracemalloc.get_traced_memory()[0]
+
+        # cProfile hanya untuk tahap terluar di thread ini (profiler tidak bisa bersarang)
+        cpu_profile = None
+        if len(stack) == 1:
+            cpu_profile = cProfile.Profile()
+            try:
+                cpu_profile.enable()
+                self._local.cpu_profile = cpu_profile
+            except ValueError:
+                # Python 3.12+: hanya satu profiler aktif per interpreter
+                cpu_profile = None
+
+        start = time.perf_counter()
+        hidden_start = self._local.hidden_seconds
+        try:
+            yield
+        finally:
+            # Waktu snapshot tracemalloc milik tahap bersarang bukan waktu tahap ini
+            elapsed = time.perf_counter() - start - (self._local.hidden_seconds - hidden_start)
+            if cpu_profile is not None:
+                cpu_profile.disable()
+                self._local.cpu_profile = None
+            memory_growth = tracemalloc.get_traced_memory()[0] - memory_before
+            diffs = []
+            if before is not None:
+                with self._hidden():
+                    diffs = [
+                        diff for diff in tracemalloc.take_snapshot().compare_to(before, "lineno")
+                        if diff.size_diff != 0 or diff.count_diff != 0
+                    ]
+                    # Membebaskan snapshot juga mahal, jadi dilakukan di sini
+                    before = None
+
+            stack.pop()
+            with self._lock:
+                if stack:
+                    self._active_threads[thread_id] = tuple(stack)
+                else:
+                    self._active_threads.pop(thread_id, None)
+
+                self._timings.setdefault(name, []).append(elapsed)
+                self._memory_growth.setdefault(name, []).append(memory_growth)
+
+                if cpu_profile is not None:
+                    if name in self._cpu_stats:
+                        self._cpu_stats[name].add(cpu_profile)
+                    else:
+                        self._cpu_stats[name] = pstats.Stats(cpu_profile)
+
+                memory = self._memory.setdefault(name, {})
+                for diff in diffs:
+                    frame = diff.traceback[0]
+                    if frame.filename in _IGNORED_FILES:
+                        continue
+                    entry = memory.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+                    entry[0] += diff.size_diff
+                    entry[1] += diff.count_diff
+
+    @contextmanager
+    def _hidden(self):
+        # cProfile tahap luar dijeda dan thread ini disembunyikan dari sampler
+        # agar biaya snapshot tracemalloc tidak ikut masuk ke profil CPU.
+        # Durasinya diakumulasi per thread lalu dikurangkan dari waktu
+        # semua tahap yang sedang terbuka
+        thread_id = threading.get_ident()
+        with self._lock:
+            stages = self._active_threads.pop(thread_id, None)
+        cpu_profile = getattr(self._local, "cpu_profile", None)
+        if cpu_profile is not None:
+            cpu_profile.disable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.hidden_seconds += time.perf_counter() - start
+            if cpu_profile is not None:
+                cpu_profile.enable()
+            if stages is not None:
+                with self._lock:
+                    self._active_threads[thread_id] = stages
+
+    def _run_sampler(self):
+        own_file = os.path.abspath(__file__)
+        labels: Dict[object, Optional[str]] = {}
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                active = dict(self._active_threads)
+            if not active:
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, stages in active.items():
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code not in labels:
+                        # Frame milik profiler sendiri tidak ditampilkan
+                        labels[code] = None if os.path.abspath(code.co_filename) == own_file else (
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        )
+                    if labels[code]:
+                        names.append(labels[code])
+                    frame = frame.f_back
+
+                folded = ";".join([f"[{stage}]" for stage in stages] + names[::-1])
+                with self._lock:
+                    self._folded[folded] = self._folded.get(folded, 0) + 1
+
+    def dump(self) -> str:
+        """
+        Tulis semua hasil profil ke disk
+
+        Returns:
+            Path folder hasil profil
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            folded = dict(self._folded)
+            cpu_stats = dict(self._cpu_stats)
+            memory = {name: dict(entries) for name, entries in self._memory.items()}
+            memory_growth = {name: list(values) for name, values in self._memory_growth.items()}
+            timings = {name: list(values) for name, values in self._timings.items()}
+
+        with open(os.path.join(self.output_dir, "cpu.folded"), "w", encoding="utf-8") as f:
+            for stack, count in sorted(folded.items()):
+                f.write(f"{stack} {count}\n")
+
+        for name, stats in cpu_stats.items():
+            stats.dump_stats(os.path.join(self.output_dir, f"cpu_{name}.prof"))
+
+        with open(os.path.join(self.output_dir, "memory_top.txt"), "w", encoding="utf-8") as f:
+            current, peak = tracemalloc.get_traced_memory()
+            f.write(f"Memori ter-trace sekarang: {current / 1024:.1f} KiB, puncak: {peak / 1024:.1f} KiB\n")
+            for name, growth in memory_growth.items():
+                f.write(f"\n=== {name}: {len(growth)} panggilan, pertumbuhan bersih total "
+                        f"{sum(growth) / 1024:.1f} KiB, maks per panggilan {max(growth) / 1024:.1f} KiB ===\n")
+                entries = memory.get(name, {})
+                if entries:
+                    f.write(f"Top {self.top_n} lokasi ({min(len(growth), self.snapshot_calls)} panggilan pertama):\n")
+                top = sorted(entries.items(), key=lambda item: item[1][0], reverse=True)[:self.top_n]
+                for location, (size, count) in top:
+                    f.write(f"{size / 1024:>12.1f} KiB {count:>+10} blok  {location}\n")
+
+            f.write(f"\n=== Top {self.top_n} alokasi yang masih hidup ===\n")
+            statistics = [
+                stat for stat in tracemalloc.take_snapshot().statistics("lineno")
+                if stat.traceback[0].filename not in _IGNORED_FILES
+            ]
+            for stat in statistics[:self.top_n]:
+                frame = stat.traceback[0]
+                f.write(f"{stat.size / 1024:>12.1f} KiB {stat.count:>10} blok  {frame.filename}:{frame.lineno}\n")
+
+        with open(os.path.join(self.output_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{'stage':<24} {'calls':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10} {'mem KiB':>10}\n")
+            for name, values in sorted(timings.items(), key=lambda item: -sum(item[1])):
+                growth = sum(memory_growth.get(name, [0])) / 1024
+                f.write(f"{name:<24} {len(values):>7} {sum(values):>10.3f} "
+                        f"{sum(values) / len(values) * 1000:>10.2f} {max(values) * 1000:>10.2f} {growth:>10.1f}\n")
+
+        print(f"Hasil profiling disimpan di {self.output_dir}")
+        return self.output_dir
+
+    def stop(self):
+        """
+        Hentikan sampler dan tulis hasil profil
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._sampler.join()
+        self.dump()
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def enable_profiling(output_dir: Optional[str] = None) -> Profiler:
+    """
+    Aktifkan mode profiling untuk proses ini (idempotent). Hasil ditulis
+    otomatis saat proses selesai.
+
+    Args:
+        output_dir: Folder hasil profil (default CHATBOT_PROFILE_DIR atau 'profiles')
+    """
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler(output_dir or os.getenv(PROFILE_DIR_ENV, "profiles"))
+            atexit.register(_profiler.stop)
+            print(f"Mode profiling aktif, hasil akan disimpan di {_profiler.output_dir}")
+        return _profiler
+
+
+def enable_profiling_from_env() -> Optional[Profiler]:
+    """
+    Aktifkan profiling jika CHATBOT_PROFILE di-set (1/true/yes)
+    """
+    if os.getenv(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes"):
+        return enable_profiling()
+    return None
+
+
+def get_profiler() -> Optional[Profiler]:
+    """
+    Profiler aktif, atau None jika mode profiling tidak aktif
+    """
+    return _profiler
+
+
+def profiled(stage_name: str) -> Callable:
+    """
+    Decorator untuk memprofil sebuah fungsi sebagai satu tahap.
+    Tanpa mode profiling, overhead-nya hanya satu pengecekan variabel global.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -4,29 +4,213 @@ Sistem untuk load dokumen, split text, create embeddings, dan setup vector datab
 """
 
 import os
-from typing import List
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from embedding_cache import DEFAULT_CACHE_DIRECTORY, DEFAULT_CACHE_MAX_MB, CachedEmbeddings, EmbeddingCache
+from dedup import MinHashDeduplicator
+from embedding_server import DEFAULT_MODEL, DEFAULT_SOCKET_PATH, connect_embedding_server
+from profiling import profiled
+from index_versions import (
+    CURRENT_CHECK_INTERVAL,
+    VERSION_GRACE_PERIOD,
+    DocumentsWatcher,
+    IndexVersion,
+    close_vectorstore,
+    collect_versions,
+    mark_retired,
+    new_version_path,
+    read_current_version,
+    write_current_version,
+)
+
+# Domain untuk setiap topic (nama file di folder documents)
+TOPIC_DOMAINS = {
+    "tentang_python": "teknologi",
+    "ai_machine_learning": "teknologi",
+    "web_development": "teknologi",
+    "data_science": "teknologi",
+    "tekken_story": "tekken",
+    "tekken_world_history": "tekken",
+    "reina_character_lore": "tekken",
+}
+
+# Kata kunci untuk menebak domain dokumen yang belum terdaftar
+DOMAIN_KEYWORDS = {
+    "tekken": ["tekken", "mishima", "devil gene"],
+    "teknologi": ["python", "machine learning", "programming", "framework"],
+}
+
+DEFAULT_DOMAIN = "umum"
+
+# Rebuild di background menambahkan chunk per batch kecil. add ke Chroma
+# memegang GIL, jadi jika ada query yang berjalan atau datang selama batch,
+# rebuild berhenti sejenak (REBUILD_YIELD_FACTOR x durasi batch) agar query
+# tidak ikut tertahan. Tanpa query, rebuild berjalan penuh tanpa jeda.
+REBUILD_BATCH_SIZE = 8
+REBUILD_YIELD_FACTOR = 8.0
+
+
+class SerializedEmbeddings(Embeddings):
+    """
+    Wrapper yang menyerialkan panggilan ke model embedding lokal.
+    Tokenizer HuggingFace (fast tokenizer) tidak aman dipakai paralel
+    ("Already borrowed"), jadi hanya bagian ini yang dikunci. Dokumen
+    di-embed per batch kecil dan query yang sedang menunggu didahulukan,
+    sehingga query paling lama menunggu satu batch dokumen selama rebuild.
+    """
+    
+    def __init__(self, embeddings: Embeddings, batch_size: int = 32):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self._condition = threading.Condition()
+        self._busy = False
+        # Batch dokumen menunggu query yang sudah antre saat batch itu datang
+        # (query yang datang belakangan tidak membuat rebuild kelaparan)
+        self._queries_queued = 0
+        self._queries_served = 0
+    
+    @property
+    def model_name(self) -> Optional[str]:
+        """
+        Nama model yang dibungkus (untuk pengecekan key cache)
+        """
+        return getattr(self.embeddings, "model_name", None)
+    
+    @contextmanager
+    def _hold(self, query: bool):
+        with self._condition:
+            if query:
+                self._queries_queued += 1
+                while self._busy:
+                    self._condition.wait()
+                self._queries_served += 1
+            else:
+                queued = self._queries_queued
+                while self._busy or self._queries_served < queued:
+                    self._condition.wait()
+            self._busy = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            with self._hold(query=False):
+                vectors.extend(self.embeddings.embed_documents(texts[i:i + self.batch_size]))
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        with self._hold(query=True):
+            return self.embeddings.embed_query(text)
+
+
+class LiveIndexRetriever(BaseRetriever):
+    """
+    Retriever yang selalu mencari di versi index yang sedang aktif,
+    sehingga tetap valid setelah index di-swap oleh rebuild_index()
+    """
+    
+    rag_system: Any
+    k: int = 3
+    filter: Optional[dict] = None
+    
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.rag_system.search_documents(query, k=self.k, filter=self.filter)
+
 
 class RAGSystem:
-    def __init__(self, documents_path: str = "documents", persist_directory: str = "chroma_db"):
+    """
+    Load dokumen, split, embed, dan simpan ke Chroma.
+    
+    Concurrency: setup_rag() aman dipanggil dari banyak thread (hanya satu yang
+    membangun index). Setelah setup, search_documents(), search_documents_by_vector(),
+    embed_queries() dan get_retriever() aman dipanggil paralel: setiap query memegang
+    referensi ke satu versi index, rebuild_index() (di proses ini atau proses lain,
+    lewat pointer CURRENT) hanya mengganti referensi versi aktif secara atomik,
+    query Chroma memakai lock internal Chroma, dan model
+    embedding lokal diserialkan oleh SerializedEmbeddings. Konfigurasi (path,
+    embeddings, splitter, deduplicator) dibekukan setelah setup_rag() berhasil
+    (assignment baru akan raise AttributeError).
+    """
+    
+    # Atribut yang tidak boleh diubah setelah setup_rag()
+    _FROZEN_ATTRIBUTES = ("documents_path", "persist_directory", "embedding_model", "base_embeddings",
+                          "embeddings", "text_splitter", "deduplicator")
+    
+    def __init__(self, documents_path: str = "documents", persist_directory: str = "chroma_db",
+                 embedding_model: Optional[str] = None,
+                 embedding_cache_directory: Optional[str] = DEFAULT_CACHE_DIRECTORY,
+                 embedding_cache_max_mb: float = DEFAULT_CACHE_MAX_MB,
+                 deduplicate: bool = False, dedup_threshold: float = 0.8,
+                 embedding_server_socket: Optional[str] = DEFAULT_SOCKET_PATH,
+                 embeddings: Optional[Embeddings] = None):
         """
         Inisialisasi RAG System
         
         Args:
             documents_path: Path ke folder yang berisi dokumen
             persist_directory: Path untuk menyimpan vector database
+            embedding_model: Nama model embedding HuggingFace (default all-MiniLM-L6-v2)
+            embedding_cache_directory: Folder cache embedding yang dipakai bersama
+                oleh semua vector store (None untuk menonaktifkan cache)
+            embedding_cache_max_mb: Batas ukuran cache embedding dalam MB
+            deduplicate: Gabungkan chunk yang hampir identik saat ingest
+            dedup_threshold: Containment shingle minimum untuk dianggap duplikat
+            embedding_server_socket: Unix socket embedding server; dipakai otomatis
+                jika server berjalan (None untuk selalu memuat model sendiri)
+            embeddings: Objek Embeddings kustom (mis. untuk test); jika diisi,
+                embedding server dan model HuggingFace tidak dipakai, dan cache
+                embedding hanya aktif jika embedding_model juga diisi
         """
+        self._frozen = False
         self.documents_path = documents_path
         self.persist_directory = persist_directory
+        self.embedding_model = embedding_model or DEFAULT_MODEL
         
-        # Inisialisasi embeddings menggunakan model gratis dari HuggingFace
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        # Vektor dari embeddings kustom tidak boleh tersimpan di bawah key model
+        # default, karena build berikutnya dengan model asli akan memakainya
+        if embeddings is not None and embedding_model is None and embedding_cache_directory:
+            print("Embeddings kustom tanpa embedding_model, cache embedding tidak dipakai")
+            embedding_cache_directory = None
+        
+        # Gunakan embedding server lokal jika tersedia (model dimuat sekali untuk
+        # semua proses), jika tidak muat model gratis dari HuggingFace di proses ini
+        # (model lokal juga jadi cadangan jika server berhenti di tengah jalan)
+        self.base_embeddings = embeddings
+        if self.base_embeddings is None and embedding_server_socket:
+            self.base_embeddings = connect_embedding_server(
+                embedding_server_socket, model_name=self.embedding_model,
+                fallback_factory=self._load_local_embeddings
+            )
+        if self.base_embeddings is None:
+            self.base_embeddings = self._load_local_embeddings()
+        
+        # Cache embedding berbasis (model, hash teks chunk) agar rebuild index
+        # tidak meng-embed ulang chunk yang sudah pernah dihitung
+        if embedding_cache_directory:
+            self.embeddings = CachedEmbeddings(
+                self.base_embeddings,
+                EmbeddingCache(embedding_cache_directory, max_size_mb=embedding_cache_max_mb),
+                model_name=self.embedding_model
+            )
+        else:
+            self.embeddings = self.base_embeddings
         
         # Inisialisasi text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -35,8 +219,170 @@ class RAGSystem:
             length_function=len,
         )
         
-        self.vectorstore = None
+        # Deduplikasi near-duplicate chunk (MinHash/LSH)
+        self.deduplicator = MinHashDeduplicator(threshold=dedup_threshold) if deduplicate else None
+        
+        # Versi index aktif; diganti secara atomik oleh rebuild_index() atau saat
+        # proses lain sudah menulis versi baru di CURRENT
+        self._active_index: Optional[IndexVersion] = None
+        self._open_versions: List[IndexVersion] = []
+        # Versi yang sudah tidak dipakai; ditutup dan dihapus oleh thread GC
+        self._pending_release: List[IndexVersion] = []
+        self._gc_scheduled = False
+        self._gc_lock = threading.Lock()
+        # Penanda aktivitas query untuk throttling rebuild
+        self._queries_started = 0
+        self._queries_active = 0
+        self._index_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_current_check = time.monotonic()
+        self.current_check_interval = CURRENT_CHECK_INTERVAL
+        self.version_grace_period = VERSION_GRACE_PERIOD
+        self._rebuild_lock = threading.Lock()
+        self._setup_lock = threading.Lock()
+    
+    def _load_local_embeddings(self) -> Embeddings:
+        return SerializedEmbeddings(HuggingFaceEmbeddings(
+            model_name=self.embedding_model
+        ))
+    
+    @property
+    def vectorstore(self):
+        """
+        Vector store dari versi index yang sedang aktif
+        """
+        active = self._active_index
+        return active.vectorstore if active else None
+    
+    @property
+    def index_path(self) -> Optional[str]:
+        """
+        Folder versi index yang sedang aktif
+        """
+        active = self._active_index
+        return active.path if active else None
+    
+    @vectorstore.setter
+    def vectorstore(self, vectorstore):
+        self._swap_index(IndexVersion(vectorstore, self.persist_directory) if vectorstore else None)
+    
+    def _swap_index(self, new_version: Optional[IndexVersion]):
+        """
+        Ganti versi index aktif; client versi lama ditutup setelah query yang
+        masih memakainya selesai
+        """
+        if new_version is not None and not new_version.filterable:
+            print("Peringatan: index belum punya metadata domain/topic, filter metadata diabaikan. "
+                  "Bangun ulang index (rebuild_index() atau hapus folder index) untuk mengaktifkan filter.")
+        
+        with self._index_lock:
+            old_version = self._active_index
+            self._active_index = new_version
+            if new_version is not None:
+                self._open_versions.append(new_version)
+            if old_version is None:
+                return
+            old_version.retired = True
+            released = self._release_if_unused(old_version)
+        
+        if released:
+            self._schedule_collect()
+    
+    def _release_if_unused(self, version: IndexVersion) -> bool:
+        # Dipanggil dengan _index_lock dipegang; client ditutup oleh thread GC
+        if not version.should_release():
+            return False
+        self._open_versions.remove(version)
+        self._pending_release.append(version)
+        return True
+    
+    def _schedule_collect(self):
+        """
+        Jalankan _collect_versions() di thread background agar query yang
+        melepas versi terakhir tidak menunggu rmtree satu folder index
+        """
+        with self._index_lock:
+            if self._gc_scheduled:
+                return
+            self._gc_scheduled = True
+        threading.Thread(target=self._collect_versions, name="rag-version-gc", daemon=True).start()
+    
+    def _collect_versions(self):
+        """
+        Tutup client versi yang sudah dilepas, lalu hapus folder versi lama
+        yang sudah melewati masa tenggang
+        """
+        with self._gc_lock:
+            with self._index_lock:
+                self._gc_scheduled = False
+                pending, self._pending_release = self._pending_release, []
+            for version in pending:
+                version.release()
+            with self._index_lock:
+                in_use = [version.path for version in self._open_versions + self._pending_release]
+            collect_versions(self.persist_directory, self.version_grace_period, in_use)
+    
+    def _queries_since(self, queries_started: int) -> bool:
+        """
+        Apakah ada query yang sedang berjalan atau dimulai sejak penanda
+        `queries_started` (nilai _queries_started sebelumnya)
+        """
+        with self._index_lock:
+            return self._queries_active > 0 or self._queries_started != queries_started
+    
+    def _refresh_index(self):
+        """
+        Pindah ke versi di CURRENT jika proses lain sudah me-rebuild index
+        (dicek paling sering setiap current_check_interval detik)
+        """
+        if self._active_index is None:
+            return
+        if time.monotonic() - self._last_current_check < self.current_check_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        
+        try:
+            self._last_current_check = time.monotonic()
+            version_path = read_current_version(self.persist_directory)
+            if version_path and version_path != self.index_path:
+                vectorstore = Chroma(
+                    persist_directory=version_path,
+                    embedding_function=self.embeddings
+                )
+                self._swap_index(IndexVersion(vectorstore, version_path))
+                print(f"Index versi {os.path.basename(version_path)} dari proses lain dimuat")
+            self._schedule_collect()
+        except Exception as e:
+            print(f"Error saat memuat index versi terbaru: {e}")
+        finally:
+            self._refresh_lock.release()
+    
+    @contextmanager
+    def _use_index(self) -> Iterator[Optional[IndexVersion]]:
+        """
+        Pegang versi index aktif selama satu query berjalan
+        """
+        with self._index_lock:
+            version = self._active_index
+            if version is not None:
+                version.in_flight += 1
+            self._queries_started += 1
+            self._queries_active += 1
+        
+        released = False
+        try:
+            yield version
+        finally:
+            with self._index_lock:
+                self._queries_active -= 1
+                if version is not None:
+                    version.in_flight -= 1
+                    released = self._release_if_unused(version)
+            if released:
+                self._schedule_collect()
     
+    @profiled("load_documents")
     def load_documents(self) -> List[Document]:
         """
         Load semua dokumen dari folder documents
@@ -54,6 +400,10 @@ class RAGSystem:
             )
             documents = loader.load()
             
+            # Tag metadata level dokumen (topic/domain) untuk filtered search
+            for doc in documents:
+                doc.metadata.update(self.document_metadata(doc))
+            
             print(f"Berhasil memuat {len(documents)} dokumen")
             return documents
             
@@ -61,6 +411,40 @@ class RAGSystem:
             print(f"Error saat memuat dokumen: {e}")
             return []
     
+    @staticmethod
+    def document_metadata(doc: Document) -> dict:
+        """
+        Tentukan metadata level dokumen: topic (nama file), domain, judul, dan ukuran
+        
+        Args:
+            doc: Document hasil loader
+            
+        Returns:
+            Dict metadata tambahan
+        """
+        source = doc.metadata.get("source", "")
+        topic = os.path.splitext(os.path.basename(source))[0].lower()
+        
+        domain = TOPIC_DOMAINS.get(topic)
+        if domain is None:
+            # Dokumen baru: tebak domain dari kata kunci di isi dokumen
+            content = doc.page_content.lower()
+            domain = DEFAULT_DOMAIN
+            for candidate, keywords in DOMAIN_KEYWORDS.items():
+                if any(keyword in content for keyword in keywords):
+                    domain = candidate
+                    break
+        
+        first_line = doc.page_content.strip().split("\n", 1)[0].strip()
+        return {
+            "topic": topic,
+            "domain": domain,
+            "doc_id": source,
+            "title": first_line[:100],
+            "char_count": len(doc.page_content),
+        }
+    
+    @profiled("split_documents")
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """
         Split dokumen menjadi chunks yang lebih kecil
@@ -73,6 +457,14 @@ class RAGSystem:
         """
         try:
             split_docs = self.text_splitter.split_documents(documents)
+            
+            # Nomor urut chunk di dalam dokumen asalnya
+            chunk_counters = {}
+            for doc in split_docs:
+                doc_id = doc.metadata.get("doc_id", doc.metadata.get("source", ""))
+                doc.metadata["chunk_index"] = chunk_counters.get(doc_id, 0)
+                chunk_counters[doc_id] = doc.metadata["chunk_index"] + 1
+            
             print(f"Dokumen dibagi menjadi {len(split_docs)} chunks")
             return split_docs
             
@@ -80,6 +472,32 @@ class RAGSystem:
             print(f"Error saat split dokumen: {e}")
             return []
     
+    @profiled("deduplicate_documents")
+    def deduplicate_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Gabungkan chunk yang hampir identik dan catat semua sumbernya di metadata
+        
+        Args:
+            documents: List of split Document objects
+            
+        Returns:
+            List of Document tanpa near-duplicate
+        """
+        if not self.deduplicator or not documents:
+            return documents
+        
+        try:
+            unique_docs = self.deduplicator.deduplicate(documents)
+            removed = len(documents) - len(unique_docs)
+            print(f"Deduplikasi: {len(documents)} -> {len(unique_docs)} chunks "
+                  f"({removed} near-duplicate digabung, index {removed / len(documents):.1%} lebih kecil)")
+            return unique_docs
+            
+        except Exception as e:
+            print(f"Error saat deduplikasi dokumen: {e}")
+            return documents
+    
+    @profiled("create_vectorstore")
     def create_vectorstore(self, documents: List[Document]) -> bool:
         """
         Buat vector store dari dokumen
@@ -92,11 +510,7 @@ class RAGSystem:
         """
         try:
             # Buat vector store menggunakan Chroma
-            self.vectorstore = Chroma.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                persist_directory=self.persist_directory
-            )
+            self.vectorstore = self._build_vectorstore(documents, self.persist_directory)
             
             print(f"Vector store berhasil dibuat dengan {len(documents)} dokumen")
             return True
@@ -105,6 +519,29 @@ class RAGSystem:
             print(f"Error saat membuat vector store: {e}")
             return False
     
+    def _build_vectorstore(self, documents: List[Document], persist_directory: str,
+                           yield_to_queries: bool = False):
+        if not yield_to_queries:
+            return Chroma.from_documents(
+                documents=documents,
+                embedding=self.embeddings,
+                persist_directory=persist_directory
+            )
+        
+        def step(func, *args):
+            start = time.perf_counter()
+            queries_started = self._queries_started
+            result = func(*args)
+            # Jeda hanya jika ada query yang ikut tertahan oleh langkah ini
+            if self._queries_since(queries_started):
+                time.sleep((time.perf_counter() - start) * REBUILD_YIELD_FACTOR)
+            return result
+        
+        vectorstore = step(lambda: Chroma(persist_directory=persist_directory, embedding_function=self.embeddings))
+        for i in range(0, len(documents), REBUILD_BATCH_SIZE):
+            step(vectorstore.add_documents, documents[i:i + REBUILD_BATCH_SIZE])
+        return vectorstore
+    
     def load_existing_vectorstore(self) -> bool:
         """
         Load vector store yang sudah ada
@@ -113,6 +550,17 @@ class RAGSystem:
             True jika berhasil, False jika gagal
         """
         try:
+            # Pakai versi hasil rebuild terakhir jika ada
+            version_path = read_current_version(self.persist_directory)
+            if version_path:
+                vectorstore = Chroma(
+                    persist_directory=version_path,
+                    embedding_function=self.embeddings
+                )
+                self._swap_index(IndexVersion(vectorstore, version_path))
+                print(f"Vector store versi {os.path.basename(version_path)} berhasil dimuat")
+                return True
+            
             if os.path.exists(self.persist_directory):
                 self.vectorstore = Chroma(
                     persist_directory=self.persist_directory,
@@ -128,19 +576,43 @@ class RAGSystem:
             print(f"Error saat memuat vector store: {e}")
             return False
     
-    def setup_rag(self) -> bool:
+    def setup_rag(self, read_only: bool = False) -> bool:
         """
         Setup lengkap RAG system
         
+        Args:
+            read_only: Jika True, hanya memuat vector store yang sudah ada dan
+                tidak pernah membangun index baru (dipakai oleh worker server
+                yang berbagi satu index di disk)
+        
         Returns:
             True jika berhasil, False jika gagal
         """
+        with self._setup_lock:
+            if self.vectorstore is not None:
+                self._frozen = True
+                return True
+            if not self._setup_rag(read_only):
+                return False
+            self._frozen = True
+            return True
+    
+    def __setattr__(self, name, value):
+        if name in self._FROZEN_ATTRIBUTES and self.__dict__.get("_frozen"):
+            raise AttributeError(f"'{name}' tidak bisa diubah setelah setup_rag()")
+        super().__setattr__(name, value)
+    
+    def _setup_rag(self, read_only: bool) -> bool:
         print("=== Setup RAG System ===")
         
         # Coba load vector store yang sudah ada
         if self.load_existing_vectorstore():
             return True
         
+        if read_only:
+            print("Mode read-only: vector store tidak akan dibuat")
+            return False
+        
         # Jika belum ada, buat dari awal
         print("Membuat vector store baru...")
         
@@ -154,7 +626,10 @@ class RAGSystem:
         if not split_docs:
             return False
         
-        # 3. Buat vector store
+        # 3. Gabungkan chunk yang hampir identik
+        split_docs = self.deduplicate_documents(split_docs)
+        
+        # 4. Buat vector store
         success = self.create_vectorstore(split_docs)
         
         if success:
@@ -162,45 +637,176 @@ class RAGSystem:
         
         return success
     
-    def search_documents(self, query: str, k: int = 3) -> List[Document]:
+    @profiled("search_documents")
+    def search_documents(self, query: str, k: int = 3, filter: Optional[dict] = None) -> List[Document]:
         """
         Cari dokumen yang relevan dengan query
         
         Args:
             query: Pertanyaan atau query
             k: Jumlah dokumen yang akan dikembalikan
+            filter: Filter metadata Chroma, misalnya {"domain": "tekken"}
             
         Returns:
             List of relevant documents
         """
-        if not self.vectorstore:
-            print("Vector store belum diinisialisasi")
-            return []
+        self._refresh_index()
+        with self._use_index() as version:
+            if not version:
+                print("Vector store belum diinisialisasi")
+                return []
+            
+            try:
+                # Index lama belum punya metadata domain/topic: filter diabaikan
+                if not version.filterable:
+                    filter = None
+                relevant_docs = version.vectorstore.similarity_search(query, k=k, filter=filter)
+                
+                print(f"Ditemukan {len(relevant_docs)} dokumen relevan")
+                return relevant_docs
+                
+            except Exception as e:
+                print(f"Error saat mencari dokumen: {e}")
+                return []
+    
+    @profiled("embed_queries")
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed banyak query sekaligus (satu panggilan model per batch)
         
-        try:
-            relevant_docs = self.vectorstore.similarity_search(query, k=k)
-            print(f"Ditemukan {len(relevant_docs)} dokumen relevan")
-            return relevant_docs
+        Args:
+            queries: List pertanyaan
             
-        except Exception as e:
-            print(f"Error saat mencari dokumen: {e}")
-            return []
+        Returns:
+            List embedding, urutan sama dengan input
+        """
+        # Pakai model dasar (bukan cache chunk) agar pertanyaan tidak mengisi cache dokumen
+        return self.base_embeddings.embed_documents(queries)
+    
+    @profiled("search_documents")
+    def search_documents_by_vector(self, embedding: List[float], k: int = 3,
+                                   filter: Optional[dict] = None) -> List[Document]:
+        """
+        Cari dokumen relevan dari embedding query yang sudah dihitung
+        
+        Args:
+            embedding: Embedding query
+            k: Jumlah dokumen yang akan dikembalikan
+            filter: Filter metadata Chroma (opsional)
+            
+        Returns:
+            List of relevant documents
+        """
+        self._refresh_index()
+        with self._use_index() as version:
+            if not version:
+                print("Vector store belum diinisialisasi")
+                return []
+            
+            try:
+                if not version.filterable:
+                    filter = None
+                return version.vectorstore.similarity_search_by_vector(embedding, k=k, filter=filter)
+                
+            except Exception as e:
+                print(f"Error saat mencari dokumen: {e}")
+                return []
     
-    def get_retriever(self, k: int = 3):
+    def get_retriever(self, k: int = 3, filter: Optional[dict] = None):
         """
         Dapatkan retriever untuk RAG chain
         
         Args:
             k: Jumlah dokumen yang akan dikembalikan
+            filter: Filter metadata Chroma (opsional)
             
         Returns:
-            Vectorstore retriever
+            Retriever yang selalu memakai versi index aktif
         """
         if not self.vectorstore:
             print("Vector store belum diinisialisasi")
             return None
         
-        return self.vectorstore.as_retriever(search_kwargs={"k": k})
+        return LiveIndexRetriever(rag_system=self, k=k, filter=filter)
+    
+    def rebuild_index(self, validation_query: str = "Apa itu Python?") -> bool:
+        """
+        Bangun index versi baru di folder terpisah, validasi, lalu swap secara
+        atomik tanpa menghentikan query yang sedang berjalan
+        
+        Args:
+            validation_query: Query untuk memvalidasi index baru sebelum dipakai
+            
+        Returns:
+            True jika index baru aktif, False jika rebuild gagal atau sedang berjalan
+        """
+        if not self._rebuild_lock.acquire(blocking=False):
+            print("Rebuild index sedang berjalan")
+            return False
+        
+        version_path = None
+        vectorstore = None
+        try:
+            print("=== Rebuild Index (background) ===")
+            documents = self.load_documents()
+            split_docs = self.deduplicate_documents(self.split_documents(documents))
+            if not split_docs:
+                print("Rebuild dibatalkan: tidak ada dokumen")
+                return False
+            
+            version_path = new_version_path(self.persist_directory)
+            vectorstore = self._build_vectorstore(split_docs, version_path, yield_to_queries=True)
+            
+            # Validasi sebelum swap: jumlah chunk sesuai dan search mengembalikan hasil
+            count = len(vectorstore.get(include=[])["ids"])
+            if count != len(split_docs) or not vectorstore.similarity_search(validation_query, k=1):
+                raise ValueError(f"validasi gagal ({count} dari {len(split_docs)} chunk)")
+            
+            # _refresh_lock: query lain tidak ikut memuat versi ini dari CURRENT sebelum swap
+            with self._refresh_lock:
+                previous_path = read_current_version(self.persist_directory)
+                write_current_version(self.persist_directory, version_path)
+                if previous_path:
+                    # Proses lain mungkin masih memakai versi lama; hapus setelah masa tenggang
+                    mark_retired(previous_path)
+                self._swap_index(IndexVersion(vectorstore, version_path))
+            print(f"=== Index versi {os.path.basename(version_path)} aktif ({count} chunks) ===")
+            self._collect_versions()
+            return True
+            
+        except Exception as e:
+            print(f"Error saat rebuild index: {e}")
+            if version_path and version_path != self.index_path:
+                if vectorstore is not None:
+                    close_vectorstore(vectorstore, version_path)
+                shutil.rmtree(version_path, ignore_errors=True)
+            return False
+        
+        finally:
+            self._rebuild_lock.release()
+    
+    def rebuild_index_async(self) -> threading.Thread:
+        """
+        Jalankan rebuild_index() di background thread
+        
+        Returns:
+            Thread rebuild (bisa di-join)
+        """
+        thread = threading.Thread(target=self.rebuild_index, name="rag-rebuild", daemon=True)
+        thread.start()
+        return thread
+    
+    def watch_documents(self, interval: float = 5.0) -> DocumentsWatcher:
+        """
+        Pantau folder dokumen dan rebuild index di background saat ada perubahan
+        
+        Args:
+            interval: Jeda polling dalam detik
+            
+        Returns:
+            DocumentsWatcher yang sudah berjalan (panggil stop() untuk berhenti)
+        """
+        return DocumentsWatcher(self.documents_path, self.rebuild_index, interval=interval).start()
 
 
 def main():
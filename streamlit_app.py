@@ -5,7 +5,23 @@ Interface web sederhana untuk berinteraksi dengan chatbot
 
 import streamlit as st
 import os
-from chatbot_rag import ChatbotRAG
+from typing import Dict, List
+from chat_server import ChatbotClient
+from conversation_store import ConversationStore, get_default_store
+from profiling import enable_profiling_from_env
+
+
+def create_chatbot():
+    """
+    Buat chatbot: klien tipis ke chat_server jika CHATBOT_SERVER_URL di-set,
+    jika tidak, ChatbotRAG in-process
+    """
+    server_url = os.getenv("CHATBOT_SERVER_URL")
+    if server_url:
+        return ChatbotClient(server_url)
+    
+    from chatbot_rag import ChatbotRAG
+    return ChatbotRAG(use_openai=False, conversation_store=get_default_store())
 
 
 def initialize_chatbot():
@@ -14,7 +30,7 @@ def initialize_chatbot():
     """
     if 'chatbot' not in st.session_state:
         with st.spinner('Menginisialisasi chatbot...'):
-            chatbot = ChatbotRAG(use_openai=False)
+            chatbot = create_chatbot()
             if chatbot.setup():
                 st.session_state.chatbot = chatbot
                 st.session_state.setup_complete = True
@@ -26,12 +42,54 @@ def initialize_chatbot():
     return st.session_state.get('setup_complete', False)
 
 
+def load_chat_history(conversation_id: str) -> List[Dict]:
+    """
+    Ambil riwayat percakapan: dari chat_server jika berjalan sebagai klien tipis
+    (server yang menyimpan percakapan), jika tidak dari conversation store lokal
+
+    Args:
+        conversation_id: Id percakapan
+
+    Returns:
+        List of dict berisi role dan message
+    """
+    chatbot = st.session_state.get('chatbot')
+    try:
+        if isinstance(chatbot, ChatbotClient):
+            history = chatbot.get_history(conversation_id)
+        else:
+            history = get_default_store().get_history(conversation_id)
+    except Exception as e:
+        st.warning(f"Gagal memuat riwayat percakapan: {e}")
+        return []
+    
+    return [{'role': chat['role'], 'message': chat['message']} for chat in history]
+
+
 def initialize_chat_history():
     """
-    Inisialisasi chat history
+    Inisialisasi chat history. Id percakapan disimpan di URL (?conversation=...)
+    sehingga riwayat dipulihkan dari conversation store setelah restart/reconnect.
     """
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        conversation_id = st.query_params.get("conversation")
+        if conversation_id:
+            st.session_state.chat_history = load_chat_history(conversation_id)
+        else:
+            conversation_id = ConversationStore.new_conversation_id()
+            st.query_params["conversation"] = conversation_id
+            st.session_state.chat_history = []
+        st.session_state.conversation_id = conversation_id
+
+
+def start_new_conversation():
+    """
+    Mulai percakapan baru (riwayat lama tetap tersimpan)
+    """
+    conversation_id = ConversationStore.new_conversation_id()
+    st.query_params["conversation"] = conversation_id
+    st.session_state.conversation_id = conversation_id
+    st.session_state.chat_history = []
 
 
 def add_to_chat_history(role: str, message: str):
@@ -65,6 +123,9 @@ def main():
     """
     Main Streamlit app
     """
+    # Mode profiling (CHATBOT_PROFILE=1), aktif sekali per proses
+    profiler = enable_profiling_from_env()
+    
     # Page config
     st.set_page_config(
         page_title="Chatbot RAG",
@@ -109,18 +170,23 @@ def main():
         - "Framework apa saja untuk web development Python?"
         """)
         
+        if profiler:
+            st.header("⏱️ Profiling")
+            if st.button("💾 Simpan hasil profiling", use_container_width=True):
+                st.success(f"Disimpan di {profiler.dump()}")
+        
         # Reset chat button
         if st.button("🗑️ Reset Chat", use_container_width=True):
-            st.session_state.chat_history = []
+            start_new_conversation()
             st.rerun()
     
-    # Initialize components
-    initialize_chat_history()
-    
     # Check if chatbot is initialized
     if not initialize_chatbot():
         st.stop()
     
+    # Riwayat dimuat setelah chatbot siap karena mode klien mengambilnya dari server
+    initialize_chat_history()
+    
     st.header("Ajukan Pertanyaan")
     
     # Display chat history
@@ -141,7 +207,9 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 try:
-                    response = st.session_state.chatbot.chat(prompt)
+                    response = st.session_state.chatbot.chat(
+                        prompt, conversation_id=st.session_state.conversation_id
+                    )
                     st.write(response)
                     add_to_chat_history("assistant", response)
                 except Exception as e:
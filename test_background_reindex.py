@@ -0,0 +1,199 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from chromadb.api.shared_system_client import SharedSystemClient
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+import index_versions
+from index_versions import VERSION_GRACE_PERIOD
+from rag_system import RAGSystem, SerializedEmbeddings
+
+
+QUERY_THREADS = 4
+
+# Proses terpisah yang me-rebuild index yang sama (seperti CLI di samping worker server)
+REBUILD_SCRIPT = """
+import sys
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rag_system import RAGSystem
+
+rag = RAGSystem(persist_directory=sys.argv[1], embedding_cache_directory=None,
+                embedding_server_socket=None, embeddings=DeterministicFakeEmbedding(size=384))
+sys.exit(0 if rag.rebuild_index() else 1)
+"""
+
+
+class SlowEmbeddings(Embeddings):
+    """
+    Embedder palsu dengan biaya per teks; sleep melepas GIL seperti inferensi torch
+    """
+
+    def __init__(self, size=384, seconds_per_text=0.001):
+        self.inner = DeterministicFakeEmbedding(size=size)
+        self.seconds_per_text = seconds_per_text
+
+    def embed_documents(self, texts):
+        time.sleep(self.seconds_per_text * len(texts))
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.seconds_per_text)
+        return self.inner.embed_query(text)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def query_loop(rag, stop_event, queries, errors):
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        docs = rag.search_documents("Siapa itu Reina Mishima?", k=3)
+        queries.append((start, time.perf_counter()))
+        if not docs:
+            errors.append("hasil kosong")
+
+
+def measure(rag, duration=None, during=None):
+    """
+    Jalankan query terus-menerus selama `duration` detik atau selama fungsi `during` berjalan
+
+    Returns:
+        (latency ms, error, hasil during, jumlah query yang berjalan penuh di dalam `during`)
+    """
+    stop_event = threading.Event()
+    queries, errors = [], []
+    threads = [
+        threading.Thread(target=query_loop, args=(rag, stop_event, queries, errors))
+        for _ in range(QUERY_THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+
+    window_start = time.perf_counter()
+    if during is not None:
+        result = during()
+    else:
+        time.sleep(duration)
+        result = None
+    window_end = time.perf_counter()
+
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = [(end - start) * 1000 for start, end in queries]
+    inside = sum(1 for start, end in queries if start >= window_start and end <= window_end)
+    return latencies, errors, result, inside
+
+
+def cached_chroma_paths():
+    return set(SharedSystemClient._identifier_to_system)
+
+
+def wait_until(condition, timeout=10.0):
+    # GC versi lama berjalan di thread background
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_background_reindex():
+    print("=== Test Rebuild Index di Background ===")
+
+    work_directory = tempfile.mkdtemp(prefix="test_background_reindex_")
+    persist_directory = os.path.join(work_directory, "chroma_db")
+
+    # Catat thread yang menghapus folder versi: query tidak boleh membayar rmtree
+    rmtree = index_versions.shutil.rmtree
+    gc_threads = set()
+
+    def recording_rmtree(path, *args, **kwargs):
+        gc_threads.add(threading.current_thread().name)
+        return rmtree(path, *args, **kwargs)
+
+    index_versions.shutil.rmtree = recording_rmtree
+    try:
+        rag = RAGSystem(
+            persist_directory=persist_directory,
+            embedding_cache_directory=None,
+            embedding_server_socket=None,
+            embeddings=SerializedEmbeddings(SlowEmbeddings()),
+        )
+        assert rag.setup_rag()
+        # Di dalam satu proses versi lama boleh langsung dihapus setelah query selesai
+        rag.version_grace_period = 0
+        rag.current_check_interval = 0
+        retriever = rag.get_retriever(k=3)
+
+        baseline, errors, _, _ = measure(rag, duration=2.0)
+        assert not errors, errors
+
+        # Rebuild pertama: query tetap berjalan selama index baru dibangun
+        def rebuild():
+            rag.rebuild_index_async().join()
+            return rag.index_path
+
+        during, errors, first_version, inside = measure(rag, during=rebuild)
+        assert not errors, f"Query gagal selama rebuild: {errors[:3]}"
+        assert inside >= 10, f"Hanya {inside} query berjalan selama rebuild"
+        assert first_version.startswith(os.path.join(work_directory, "chroma_db_versions"))
+        assert retriever.invoke("Siapa itu Reina Mishima?"), "Retriever lama harus memakai index baru"
+
+        base_p95 = percentile(baseline, 0.95)
+        during_p95 = percentile(during, 0.95)
+        print(f"p95 normal         : {base_p95:.2f} ms ({len(baseline)} query)")
+        print(f"p95 selama rebuild : {during_p95:.2f} ms ({len(during)} query, {inside} di dalam rebuild)")
+        assert during_p95 <= max(base_p95 * 3, base_p95 + 20), "Latency naik terlalu tinggi selama rebuild"
+
+        # Tanpa query, rebuild tidak diberi jeda
+        start = time.perf_counter()
+        rebuild()
+        idle_seconds = time.perf_counter() - start
+        print(f"Rebuild tanpa query: {idle_seconds:.2f} s")
+
+        # Rebuild berikutnya: versi sebelumnya dihapus dari disk dan dari cache client Chroma
+        start = time.perf_counter()
+        _, errors, second_version, _ = measure(rag, during=rebuild)
+        busy_seconds = time.perf_counter() - start
+        print(f"Rebuild dengan query: {busy_seconds:.2f} s")
+        assert idle_seconds < busy_seconds / 2, "Rebuild tanpa query seharusnya tidak di-throttle"
+        assert not errors, errors
+        assert second_version != first_version
+        assert wait_until(lambda: not os.path.exists(first_version)), "Versi lama belum dihapus"
+        assert first_version not in cached_chroma_paths(), "Client Chroma versi lama masih di cache"
+        assert os.path.exists(second_version)
+        print("✅ Index di-swap tanpa downtime dan versi lama dibersihkan")
+
+        # Rebuild oleh proses lain: versi yang masih dipakai proses ini tidak boleh dihapus
+        rag.version_grace_period = VERSION_GRACE_PERIOD
+        subprocess.run([sys.executable, "-c", REBUILD_SCRIPT, persist_directory],
+                       check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert os.path.exists(second_version), "Versi yang masih dipakai proses lain terhapus"
+        assert rag.search_documents("Siapa itu Reina Mishima?", k=3)
+        third_version = rag.index_path
+        assert third_version not in (first_version, second_version), "Pembaca tidak pindah ke versi di CURRENT"
+
+        # Setelah masa tenggang habis, versi lama dihapus oleh pembaca
+        os.utime(second_version + ".retired", (0, 0))
+        assert rag.search_documents("Siapa itu Reina Mishima?", k=3)
+        assert wait_until(lambda: not os.path.exists(second_version)), "Versi lama tidak dihapus setelah masa tenggang"
+        assert second_version not in cached_chroma_paths()
+        print("✅ Rebuild dari proses lain dimuat tanpa menghapus index yang masih dipakai")
+
+        assert gc_threads and gc_threads <= {"rag-rebuild", "rag-version-gc"}, f"rmtree berjalan di {gc_threads}"
+
+    finally:
+        index_versions.shutil.rmtree = rmtree
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_background_reindex()
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.runnables import RunnableLambda
+
+from chatbot_rag import ChatbotRAG
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from rag_system import RAGSystem, SerializedEmbeddings
+
+
+# Stub LLM: mengembalikan pertanyaan yang diterima (untuk cek tidak ada jawaban tertukar)
+# dan tidur sebentar untuk mensimulasikan latency I/O ke LLM sungguhan
+LLM_LATENCY = 0.01
+EMBED_LATENCY = 0.001
+# Speedup minimum 8 thread vs 1 thread
+MIN_SPEEDUP = 1.3
+
+
+class NotThreadSafeEmbeddings(Embeddings):
+    """
+    Embedder palsu yang meniru fast tokenizer HuggingFace: raise
+    "Already borrowed" jika dipanggil dari dua thread sekaligus
+    """
+
+    def __init__(self, size=384, latency=EMBED_LATENCY):
+        self.inner = DeterministicFakeEmbedding(size=size)
+        self.latency = latency
+        self.busy = False
+
+    def _run(self, func, arg):
+        if self.busy:
+            raise RuntimeError("Already borrowed")
+        self.busy = True
+        try:
+            time.sleep(self.latency)
+            return func(arg)
+        finally:
+            self.busy = False
+
+    def embed_documents(self, texts):
+        return self._run(self.inner.embed_documents, texts)
+
+    def embed_query(self, text):
+        return self._run(self.inner.embed_query, text)
+
+
+def stub_llm(prompt_value):
+    time.sleep(LLM_LATENCY)
+    question = prompt_value.to_messages()[-1].content
+    return f"JAWABAN[{question}]"
+
+
+def build_chatbot(persist_directory, llm=None):
+    rag = RAGSystem(
+        persist_directory=persist_directory,
+        embedding_cache_directory=None,
+        embedding_server_socket=None,
+        embeddings=SerializedEmbeddings(NotThreadSafeEmbeddings()),
+    )
+    chatbot = ChatbotRAG(use_openai=llm is not None, llm=llm, rag_system=rag)
+    assert chatbot.setup()
+    return chatbot
+
+
+def run_calls(chatbot, questions, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        answers = list(executor.map(chatbot.chat, questions))
+    return answers, time.perf_counter() - start
+
+
+def test_concurrent_chat():
+    print("=== Stress Test ChatbotRAG.chat() Konkuren ===")
+
+    # Stub embedder memang gagal jika dipanggil paralel tanpa SerializedEmbeddings
+    unsafe = NotThreadSafeEmbeddings()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(unsafe.embed_query, [f"q{i}" for i in range(200)]))
+        raise AssertionError("Embedder tanpa lock seharusnya raise 'Already borrowed'")
+    except RuntimeError:
+        pass
+
+    work_directory = tempfile.mkdtemp(prefix="test_concurrent_chat_")
+    try:
+        chatbot = build_chatbot(os.path.join(work_directory, "chroma_db"), llm=RunnableLambda(stub_llm))
+
+        # State dibekukan setelah setup
+        for target, name in ((chatbot, "retriever"), (chatbot.rag_system, "persist_directory")):
+            try:
+                setattr(target, name, None)
+                raise AssertionError(f"{name} seharusnya tidak bisa diubah setelah setup")
+            except AttributeError:
+                pass
+
+        # Embedder kustom tanpa embedding_model tidak boleh mengisi cache milik model default
+        cache_directory = os.path.join(work_directory, "embedding_cache")
+        fake = DeterministicFakeEmbedding(size=384)
+        rag = RAGSystem(embeddings=fake, embedding_server_socket=None, embedding_cache_directory=cache_directory)
+        assert rag.embeddings is fake, "Cache embedding seharusnya tidak dipakai"
+        rag = RAGSystem(embeddings=fake, embedding_model="fake-384", embedding_server_socket=None,
+                        embedding_cache_directory=cache_directory)
+        assert isinstance(rag.embeddings, CachedEmbeddings)
+        named = NotThreadSafeEmbeddings()
+        named.model_name = "fake-384"
+        try:
+            CachedEmbeddings(SerializedEmbeddings(named), EmbeddingCache(cache_directory), model_name="lain")
+            raise AssertionError("Model yang berbeda dari key cache seharusnya ditolak")
+        except ValueError:
+            pass
+
+        questions = [f"Pertanyaan nomor {i} tentang Reina Mishima?" for i in range(400)]
+
+        # Correctness: setiap jawaban harus milik pertanyaannya sendiri
+        answers, _ = run_calls(chatbot, questions, threads=32)
+        for question, answer in zip(questions, answers):
+            assert answer == f"JAWABAN[{question}]", f"Jawaban salah untuk {question!r}: {answer[:200]}"
+        print(f"✅ {len(answers)} jawaban konkuren benar")
+
+        # Throughput scaling: 1 thread vs 8 thread. Embedding tetap serial,
+        # jadi speedup hanya datang dari menunggu LLM secara paralel
+        sample = questions[:100]
+        _, sequential = run_calls(chatbot, sample, threads=1)
+        _, parallel = run_calls(chatbot, sample, threads=8)
+        speedup = sequential / parallel
+        print(f"1 thread : {len(sample) / sequential:.1f} chat/s")
+        print(f"8 thread : {len(sample) / parallel:.1f} chat/s (speedup {speedup:.1f}x)")
+        # Ambang sengaja longgar (di mesin referensi ~2.6x) agar tidak flaky di CI yang sibuk
+        assert speedup > MIN_SPEEDUP, f"Throughput tidak naik dengan thread (speedup {speedup:.2f}x)"
+
+        # Mode demo (tanpa LLM): jawaban konkuren harus sama dengan jawaban sekuensial
+        simple_chatbot = build_chatbot(os.path.join(work_directory, "chroma_db_simple"))
+        simple_questions = [
+            "Siapa itu Reina Mishima?",
+            "Apa itu Purple Lightning?",
+            "Apa itu Python?",
+            "Ceritakan tentang machine learning",
+            "Apa kabar?",
+        ] * 40
+        expected = {question: simple_chatbot.chat(question) for question in set(simple_questions)}
+        answers, _ = run_calls(simple_chatbot, simple_questions, threads=32)
+        for question, answer in zip(simple_questions, answers):
+            assert answer == expected[question], f"Jawaban mode demo berbeda untuk {question!r}"
+        print(f"✅ {len(answers)} jawaban mode demo konkuren sama dengan sekuensial")
+
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_concurrent_chat()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from conversation_store import ConversationStore
+
+
+def count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_conversation_store():
+    print("=== Test Conversation Store ===")
+
+    work_directory = tempfile.mkdtemp(prefix="test_conversation_store_")
+    db_path = os.path.join(work_directory, "conversations.db")
+    try:
+        # Flush interval panjang: pesan hanya ditulis saat batch penuh atau flush()
+        store = ConversationStore(db_path=db_path, flush_interval=30, max_batch_size=10)
+        batches = []
+        write_batch = store._write_batch
+        store._write_batch = lambda batch: (batches.append(len(batch)), write_batch(batch))
+
+        for i in range(25):
+            store.append("alice", "user", f"pesan {i}")
+        deadline = time.monotonic() + 5
+        while count_rows(db_path) < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert count_rows(db_path) == 20, "Dua batch penuh seharusnya sudah ditulis tanpa flush()"
+
+        # Baca setelah flush(): sisa buffer ikut tersimpan
+        history = store.get_history("alice")
+        assert [chat["message"] for chat in history] == [f"pesan {i}" for i in range(25)]
+        assert batches == [10, 10, 5], batches
+        assert [chat["message"] for chat in store.get_history("alice", limit=2)] == ["pesan 23", "pesan 24"]
+        print(f"✅ 25 pesan ditulis dalam batch {batches}")
+
+        # Argumen yang bukan string ditolak sebelum masuk buffer
+        for args in (({"x": 1}, "user", "hai"), ("alice", "user", None), ("", "user", "hai")):
+            try:
+                store.append(*args)
+                raise AssertionError(f"append{args} seharusnya ditolak")
+            except (TypeError, ValueError):
+                pass
+
+        # Satu baris rusak di dalam batch tidak boleh menghilangkan pesan user lain
+        store._queue.put(("alice", "user", "sebelum", time.time()))
+        store._queue.put(({"x": 1}, "user", "rusak", time.time()))
+        store._queue.put(("bob", "user", "sesudah", time.time()))
+        store.flush()
+        assert store.get_history("alice")[-1]["message"] == "sebelum"
+        assert [chat["message"] for chat in store.get_history("bob")] == ["sesudah"]
+        print("✅ Baris rusak hanya menghilangkan dirinya sendiri")
+
+        # close() menulis buffer yang tersisa; store baru membaca semuanya
+        store.append("carol", "user", "terakhir")
+        store.close()
+        try:
+            store.append("carol", "user", "setelah close")
+            raise AssertionError("append setelah close() seharusnya gagal")
+        except RuntimeError:
+            pass
+
+        reopened = ConversationStore(db_path=db_path)
+        assert [chat["message"] for chat in reopened.get_history("carol")] == ["terakhir"]
+        assert len(reopened.get_history("alice")) == 26
+        reopened.close()
+        print("✅ Riwayat pulih setelah close() dan dibuka ulang")
+
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_conversation_store()